@@ -0,0 +1,154 @@
+"""
+End-to-end throughput benchmark: runs main.main on synthetic invoices against the
+local Basware and SharePoint mock in benchmarks.mock_basware, with headless Chrome,
+and reports the invoices posted per minute and the per-step latencies.
+
+Every run works in a new temporary directory, so the caches, the run state and the
+status journal start empty. Needs Chrome and the chromedriver setup_driver uses.
+
+Usage:
+    python -m benchmarks.e2e_benchmark [--invoices 20] [--workers 2] [--latency 0.05]
+        [--probe-timeout 1.5] [--vendors 1566645 1433275] [--output result.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import importlib
+
+from benchmarks.mock_basware import (
+    FOLDER,
+    MASTER_DATA_FILE,
+    MockServer,
+    MockStore,
+    synthetic_invoices,
+)
+
+
+def _environment(workdir, args):
+    return {
+        "BW_USR": "benchmark",
+        "BW_PSW": "benchmark",
+        "MASTER_DATA_PATH": f"{FOLDER}/{MASTER_DATA_FILE}",
+        "MASTER_DATA_OFFLINE": "False",
+        "CACHE_DIRECTORY": os.path.join(workdir, "cache"),
+        "TEMP_DIRECTORY": os.path.join(workdir, "temp"),
+        "LOG_DIRECTORY": os.path.join(workdir, "logs"),
+        "TIMING_REPORT_PATH": os.path.join(workdir, "timing.json"),
+        "BW_WORKERS": str(args.workers),
+        "DIALOG_PROBE_TIMEOUT": str(args.probe_timeout),
+    }
+
+
+def check_posting(invoice):
+    """
+    Return the differences between the posting the bot saved and the expected one.
+    """
+    from services.posting import FIRST_POSTING_ROW, posting_lines
+
+    expected = invoice["posting_info"]
+    problems = []
+    lines = posting_lines(expected)
+    for row, (rate, amount, _) in enumerate(lines, FIRST_POSTING_ROW):
+        fields = invoice["posting_rows"].get(row, {})
+        if fields.get("c3") != expected["location"]:
+            problems.append(
+                f"row {row} location {fields.get('c3')!r} != {expected['location']!r}"
+            )
+        # Credit amounts are entered in the credit column.
+        entered = fields.get("c7" if amount >= 0 else "c8") or "nan"
+        if not abs(float(entered.replace(",", ".")) - abs(amount)) < 0.005:
+            problems.append(f"row {row} {rate} amount {entered!r} != {abs(amount)!r}")
+    extra = set(invoice["posting_rows"]) - set(
+        range(FIRST_POSTING_ROW, FIRST_POSTING_ROW + len(lines))
+    )
+    if extra:
+        problems.append(f"unexpected rows {sorted(extra)}")
+    if "approver" in expected and expected["approver"] not in invoice["processors"]:
+        problems.append(f"approver {expected['approver']!r} not set")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--invoices", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--probe-timeout", type=float, default=1.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vendors", nargs="+", default=["1566645"])
+    parser.add_argument("--output", help="write the result as JSON to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bw-benchmark-")
+    os.environ.pop("BW_SESSION_DIRECTORY", None)
+    os.environ.update(_environment(workdir, args))
+    # Generated after the environment is set, the generator imports the extractor.
+    invoices = synthetic_invoices(args.invoices, seed=args.seed, vendors=args.vendors)
+    server = MockServer(MockStore(invoices, latency=args.latency)).start()
+    os.environ["BW_URL"] = f"{server.url}/login"
+
+    # Imported after the environment is set, the modules read it on import.
+    bot = importlib.import_module("main")
+    from services.sharepoint import sharepoint_session
+    from services.pipeline import pipeline_stats
+
+    sharepoint_session.site_factory = server.site_factory
+
+    start = time.monotonic()
+    try:
+        bot.main()
+    finally:
+        elapsed = time.monotonic() - start
+        server.stop()
+
+    saved = server.store.saved()
+    incorrect = {
+        i["invoice_num"]: problems for i in saved if (problems := check_posting(i))
+    }
+    with open(os.environ["TIMING_REPORT_PATH"], encoding="utf-8") as f:
+        timing = json.load(f)
+    result = {
+        "invoices": args.invoices,
+        "workers": args.workers,
+        "latency": args.latency,
+        "saved": len(saved),
+        "incorrect": incorrect,
+        "seconds": round(elapsed, 2),
+        "invoices_per_minute": round(60 * len(saved) / elapsed, 2),
+        "logins": server.store.logins,
+        "requests": server.store.requests,
+        "stages": pipeline_stats.summary(),
+        "steps": timing["steps"],
+    }
+
+    print(
+        f"{len(saved)}/{args.invoices} invoices saved in {elapsed:.1f}s with "
+        f"{args.workers} workers: {result['invoices_per_minute']} invoices/min, "
+        f"{len(incorrect)} with an incorrect posting."
+    )
+    for stage, stats in result["stages"].items():
+        print(
+            f"  stage {stage:<14} {stats['items']:>4} items {stats['busy']:>8.1f}s busy "
+            f"{stats['mean']:>7.2f}s mean"
+        )
+    print(f"  {'step':<70} {'count':>5} {'p50':>7} {'p95':>7} {'max':>7} {'total':>8}")
+    for step, stats in list(result["steps"].items())[:25]:
+        print(
+            f"  {step[:70]:<70} {stats['count']:>5} {stats['p50']:>7.3f} "
+            f"{stats['p95']:>7.3f} {stats['max']:>7.3f} {stats['total']:>8.2f}"
+        )
+    for invoice_num, problems in incorrect.items():
+        print(f"  invoice {invoice_num}: {', '.join(problems)}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"Logs, timing report and caches in {workdir}")
+    return 0 if len(saved) == args.invoices and not incorrect else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,565 @@
+"""
+Local stand-in for Basware and SharePoint, serving the pages, iframes and element
+IDs/XPaths the bot uses, fake invoice PDFs, and a fake SharePoint document library
+holding bot_status.csv and the master data, for measuring the bot on a plain Linux box.
+
+Basware:
+- /login: the login form, shown for every page until logged in.
+- /: the top document with the menu and the application, error and dialog iframes.
+- /list: the process purchase invoices filter and result table, in the main iframe.
+- /invoice/<vendor>/<invoice_num>/...: the info, attachment (viewer), actions and
+  posting iframes of an invoice, and its PDF.
+- /dialog/<kind>: the organizational unit and processor dialogs.
+
+SharePoint: the REST and SOAP endpoints shareplum uses, under /sites/mock, with the
+files of one folder kept in memory. Use site_factory() as the site factory of
+services.sharepoint.sharepoint_session.
+
+Usage:
+    python -m benchmarks.mock_basware [--invoices 20] [--latency 0.05] [--port 8000]
+        [--vendors 1566645 1433275]
+"""
+
+import io
+import re
+import time
+import hashlib
+import uuid
+import argparse
+import logging
+import threading
+from html import escape
+
+import pandas as pd
+import requests
+from flask import Flask, Response, abort, jsonify, redirect, request
+from shareplum import Site
+from shareplum.site import Version
+from werkzeug.serving import make_server
+
+from benchmarks.synthetic_invoices import DEFAULT_LOCATIONS, generate_corpus
+from config.re_pattern_config import get_expressions
+
+SITE_PATH = "/sites/mock"
+FOLDER = "Shared Documents/Tools"
+MASTER_DATA_FILE = "master_data.xlsx"
+SESSION_COOKIE = "BWSESSION"
+SHAREPOINT_COOKIE = "FedAuth"
+
+# Locations of the generated invoices: (External ID, name matched in the PDF, approver).
+LOCATIONS = DEFAULT_LOCATIONS
+
+
+def synthetic_invoices(count, seed=0, vendors=("1566645",)):
+    """
+    Generate invoices of the given vendors, by default Yellow Service Oy Grönroos.
+
+    Returns:
+    - list: dict per invoice with 'vendor', 'invoice_num', 'location', 'approver',
+      'pdf' and the 'posting_info' the bot is expected to extract, see
+      benchmarks.synthetic_invoices.generate_invoice.
+    """
+    return list(generate_corpus(count, vendors=vendors, seed=seed))
+
+
+def master_data_excel(locations=LOCATIONS):
+    """
+    The master data Excel file, with the 'Location' sheet of the given locations.
+    """
+    content = io.BytesIO()
+    pd.DataFrame(
+        {
+            "External ID": [location for location, _, _ in locations],
+            "bw_matching": [name for _, name, _ in locations],
+            "bw_approver": [approver for _, _, approver in locations],
+        }
+    ).to_excel(content, sheet_name="Location", index=False)
+    return content.getvalue()
+
+
+def bot_status_csv(invoices):
+    """
+    The bot input listing the invoices, as the 'Supplier' and 'Invoice Number' export.
+    """
+    expressions = get_expressions()
+    return pd.DataFrame(
+        {
+            "Supplier": [
+                f"{expressions[i['vendor']][0]} / {i['vendor']}" for i in invoices
+            ],
+            "Invoice Number": [i["invoice_num"] for i in invoices],
+            "status": [None] * len(invoices),
+        }
+    ).to_csv(index=False, sep=";")
+
+
+class MockStore:
+    """
+    State of the mock: the invoices and what the bot did to them, the filter of every
+    Basware session and the SharePoint files.
+    """
+
+    def __init__(self, invoices, latency=0.0):
+        """
+        Parameters:
+        - invoices (list): The invoices, see synthetic_invoices.
+        - latency (float): Seconds every Basware page takes to respond.
+        """
+        self.latency = latency
+        self.invoices = {(i["vendor"], i["invoice_num"]): dict(i) for i in invoices}
+        for invoice in self.invoices.values():
+            invoice.update(
+                processors=["Basware Default"],
+                posting_rows={},
+                posted=False,
+                saved=None,
+            )
+        self.files = {
+            "bot_status.csv": bot_status_csv(invoices).encode("ISO-8859-1", "replace"),
+            MASTER_DATA_FILE: master_data_excel(),
+        }
+        self.sharepoint_token = uuid.uuid4().hex
+        self.sessions = {}
+        self.logins = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def saved(self):
+        """
+        Return the invoices saved by the bot, in the order they were saved.
+        """
+        with self.lock:
+            saved = [i for i in self.invoices.values() if i["saved"] is not None]
+        return sorted(saved, key=lambda i: i["saved"])
+
+
+_SHELL = """<html><head><title>Basware P2P</title><script>
+function openList() {
+    var app = document.getElementById("applicationframe").contentDocument;
+    app.getElementById("mainframe").src = "/list?opened=" + Date.now();
+}
+function openDialog(kind, query) {
+    var dialog = document.getElementById("ifa1");
+    dialog.src = "/dialog/" + kind + "?" + query;
+    dialog.style.display = "block";
+}
+function closeDialog() {
+    var dialog = document.getElementById("ifa1");
+    dialog.style.display = "none";
+    dialog.src = "about:blank";
+}
+</script></head><body><form>
+<table><tbody><tr><td>Basware</td></tr></tbody></table>
+<table><tbody><tr><td>{user}</td></tr></tbody></table>
+<table><tbody><tr><td><a href="/logout">Log out</a></td></tr></tbody></table>
+<table><tbody>
+<tr><td><span id="Menu1-menuItem003">Purchase invoices</span></td></tr>
+<tr><td><table><tbody><tr>
+<td onclick="openList()">Process purchase invoices</td><td>Search invoices</td>
+</tr></tbody></table></td></tr>
+</tbody></table>
+</form>
+<iframe id="applicationframe" src="/application" width="1800" height="900"></iframe>
+<iframe id="errorframe" src="/blank" width="400" height="100"></iframe>
+<iframe id="ifa1" src="about:blank" width="800" height="600" style="display:none"></iframe>
+</body></html>"""
+
+_LOGIN = """<html><body><form method="post" action="/login">
+<input id="txtUsername" name="username"/>
+<input id="txtPasswd" name="password" type="password"/>
+<input id="btnLogin" type="submit" value="Log in"/>
+</form></body></html>"""
+
+_POST_SCRIPT = """<script>
+function send(action, data) {
+    return fetch("%s/" + action, {method: "POST", keepalive: true,
+        headers: {"Content-Type": "application/json"}, body: JSON.stringify(data || {})});
+}
+</script>"""
+
+
+def _options(values, selected=None):
+    return "".join(
+        f"<option{' selected' if value == selected else ''}>{escape(value)}</option>"
+        for value in values
+    )
+
+
+def create_app(store):
+    """
+    Create the Flask application of the mock serving the given MockStore.
+    """
+    app = Flask(__name__)
+    expressions = get_expressions()
+
+    def session():
+        return store.sessions.get(request.cookies.get(SESSION_COOKIE))
+
+    def invoice(vendor, invoice_num):
+        found = store.invoices.get((vendor, invoice_num))
+        if found is None:
+            abort(404)
+        return found
+
+    @app.before_request
+    def check():
+        with store.lock:
+            store.requests += 1
+        if request.path.startswith(SITE_PATH):
+            if request.cookies.get(SHAREPOINT_COOKIE) != store.sharepoint_token:
+                abort(401)
+            return None
+        if store.latency:
+            time.sleep(store.latency)
+        if request.path != "/login" and session() is None:
+            return _LOGIN
+        return None
+
+    @app.route("/login", methods=["GET", "POST"])
+    def login():
+        if request.method == "GET":
+            return _LOGIN
+        token = uuid.uuid4().hex
+        with store.lock:
+            store.sessions[token] = {
+                "user": request.form.get("username", ""),
+                "company": "All",
+                "status": "All",
+                "supplier": "",
+                "invoice_num": "",
+            }
+            store.logins += 1
+        response = redirect("/")
+        response.set_cookie(SESSION_COOKIE, token)
+        return response
+
+    @app.route("/")
+    def shell():
+        return _SHELL.replace("{user}", escape(session()["user"]))
+
+    @app.route("/blank")
+    def blank():
+        return "<html><body></body></html>"
+
+    @app.route("/application")
+    def application():
+        return (
+            "<html><body>"
+            '<iframe id="mainframehdr" src="/blank" width="1700" height="50"></iframe>'
+            '<iframe id="mainframe" src="/list" width="1700" height="800"></iframe>'
+            "</body></html>"
+        )
+
+    @app.route("/list")
+    def result_list():
+        search = session()
+        if "update" in request.args:
+            for field in ("company", "status", "supplier", "invoice_num"):
+                search[field] = request.args.get(field, "").strip()
+        column = {"All": 11, "Data Incomplete": 12}.get(search["status"], 11)
+        rows = []
+        for item in store.invoices.values():
+            if item["saved"] is not None:
+                continue
+            if search["company"] not in ("All", "Spartao"):
+                continue
+            supplier = expressions[item["vendor"]][0]
+            if (
+                search["supplier"]
+                and search["supplier"].lower() not in supplier.lower()
+            ):
+                continue
+            if search["invoice_num"] and search["invoice_num"] != item["invoice_num"]:
+                continue
+            cells = [""] * 12
+            cells[0] = escape(supplier)
+            cells[1] = "Spartao"
+            cells[column - 1] = (
+                f'<a href="/invoice/{item["vendor"]}/{item["invoice_num"]}">'
+                f'{item["invoice_num"]}</a>'
+            )
+            rows.append("<tr>" + "".join(f"<td>{c}</td>" for c in cells) + "</tr>")
+        header = "<tr>" + "<th>column</th>" * 12 + "</tr>"
+        return f"""<html><body><div><form method="get" action="/list">
+<div>Process purchase invoices</div>
+<div><input type="hidden" name="update" value="1"/></div>
+<div>
+<div><select name="company">{_options(["All", "Spartao"], search["company"])}</select>
+<div>Supplier</div><div><div><input name="supplier" value="{escape(search["supplier"])}"/></div></div></div>
+<div><input id="InvoiceNumberCtrl" name="invoice_num" value="{escape(search["invoice_num"])}"/></div>
+<div></div>
+<div></div>
+<div><select name="status">{_options(["All", "Data Incomplete"], search["status"])}</select></div>
+<div><input type="submit" value="Update"/></div>
+</div>
+<div><table><tbody>{header}{"".join(rows)}</tbody></table></div>
+</form></div></body></html>"""
+
+    @app.route("/invoice/<vendor>/<invoice_num>")
+    def invoice_page(vendor, invoice_num):
+        invoice(vendor, invoice_num)
+        base = f"/invoice/{vendor}/{invoice_num}"
+        return (
+            "<html><body>"
+            f'<iframe id="infoPage" src="{base}/info" width="800" height="700"></iframe>'
+            f'<iframe id="attachmentPage" src="{base}/attachment" width="800" height="700"></iframe>'
+            f'<iframe id="actions" src="{base}/actions" width="800" height="100"></iframe>'
+            f'<iframe id="postingPage" src="{base}/posting" width="1600" height="300"></iframe>'
+            "</body></html>"
+        )
+
+    @app.route("/invoice/<vendor>/<invoice_num>/info")
+    def info(vendor, invoice_num):
+        invoice(vendor, invoice_num)
+        base = f"/invoice/{vendor}/{invoice_num}"
+        query = f"vendor={vendor}&amp;invoice_num={invoice_num}"
+        fields = {
+            2: '<div><div><button type="button" '
+            f"onclick=\"window.top.openDialog('orgunit', '{query}')\">...</button></div></div>",
+            3: '<div><div><input id="ReferenceCtrl" value="RF18 5390 0054"/></div></div>',
+            4: '<div><div><input id="MessageCtrl"/></div></div>',
+            14: '<div><div><input id="DueDateCtrl"/></div></div>',
+        }
+        rows = "".join(
+            f"<tr><td>field {row}</td><td>{fields.get(row, '')}</td></tr>"
+            for row in range(1, 15)
+        )
+        return f"""<html><head>{_POST_SCRIPT % base}<script>
+function save() {{
+    send("save", {{due_date: document.getElementById("DueDateCtrl").value,
+        reference: document.getElementById("ReferenceCtrl").value,
+        message: document.getElementById("MessageCtrl").value}}).then(function () {{
+        window.parent.location.href = "/list";
+    }});
+}}
+</script></head><body><form>
+<div>Invoice {escape(invoice_num)}</div>
+<div></div>
+<div>
+<div><div></div><div><table><tbody>{rows}</tbody></table></div></div>
+<div><input type="button" value="Save" onclick="save()"/><input type="button" value="Reject"/><input type="button" value="Post" onclick="send('post')"/></div>
+</div>
+<div></div>
+<div><input type="button" value="Forward"/><input type="button" value="Processors" onclick="window.top.openDialog('processor', '{query}')"/></div>
+</form></body></html>"""
+
+    @app.route("/invoice/<vendor>/<invoice_num>/attachment")
+    def attachment(vendor, invoice_num):
+        invoice(vendor, invoice_num)
+        return (
+            "<html><body>"
+            f'<iframe id="ViewerFrame" src="/invoice/{vendor}/{invoice_num}/viewer" '
+            'width="780" height="680"></iframe></body></html>'
+        )
+
+    @app.route("/invoice/<vendor>/<invoice_num>/viewer")
+    def viewer(vendor, invoice_num):
+        invoice(vendor, invoice_num)
+        return (
+            "<html><body>"
+            f'<a id="open-button" href="/invoice/{vendor}/{invoice_num}/pdf" '
+            f'download="{invoice_num}.pdf">Open</a></body></html>'
+        )
+
+    @app.route("/invoice/<vendor>/<invoice_num>/pdf")
+    def pdf(vendor, invoice_num):
+        return Response(
+            invoice(vendor, invoice_num)["pdf"],
+            mimetype="application/pdf",
+            headers={
+                "Content-Disposition": f'attachment; filename="{invoice_num}.pdf"'
+            },
+        )
+
+    @app.route("/invoice/<vendor>/<invoice_num>/actions")
+    def actions(vendor, invoice_num):
+        invoice(vendor, invoice_num)
+        base = f"/invoice/{vendor}/{invoice_num}"
+        return f"""<html><head>{_POST_SCRIPT % base}</head><body><form>
+<div></div>
+<div><input type="button" id="DeletePostingButton" value="Delete posting"
+onclick="if (confirm('Delete the posting values?')) send('delete')"/></div>
+<div><input type="button" value="OK" onclick="send('posted')"/><input type="button" value="Cancel"/></div>
+</form></body></html>"""
+
+    @app.route("/invoice/<vendor>/<invoice_num>/posting")
+    def posting(vendor, invoice_num):
+        invoice(vendor, invoice_num)
+        base = f"/invoice/{vendor}/{invoice_num}"
+        rows = "".join(
+            f"<tr><td>{row - 1}</td>"
+            + "".join(
+                f'<td><div><div><input name="c{column}"/></div></div></td>'
+                for column in (2, 3, 4, 5)
+            )
+            + "<td></td>"
+            + "".join(f'<td><input name="c{column}"/></td>' for column in (7, 8))
+            + f'<td><a href="#" onclick="saveRow(this); return false;">Save</a>'
+            "<a>Cancel</a></td></tr>"
+            for row in range(2, 5)
+        )
+        header = "<tr>" + "<th>column</th>" * 9 + "</tr>"
+        return f"""<html><head>{_POST_SCRIPT % base}<script>
+function saveRow(link) {{
+    var row = link.closest("tr"), values = {{row: row.rowIndex + 1}};
+    row.querySelectorAll("input").forEach(function (input) {{
+        values[input.name] = input.value;
+    }});
+    send("row", values);
+}}
+</script></head><body><form>
+<div><select id="PostingControl1_VATHandlingCtrl">{_options(["Tax excluded", "Tax included"])}</select></div>
+<div></div>
+<div><div><div></div><div></div><div><table><tbody>{header}{rows}</tbody></table></div></div></div>
+</form></body></html>"""
+
+    @app.route("/invoice/<vendor>/<invoice_num>/<action>", methods=["POST"])
+    def invoice_action(vendor, invoice_num, action):
+        item = invoice(vendor, invoice_num)
+        data = request.get_json(force=True, silent=True) or {}
+        with store.lock:
+            if action == "row":
+                item["posting_rows"][data.pop("row")] = data
+            elif action == "delete":
+                item["posting_rows"] = {}
+            elif action == "posted":
+                item["posted"] = True
+            elif action == "processors":
+                item["processors"] = data["processors"]
+            elif action == "save":
+                item["fields"] = data
+                item["saved"] = time.time()
+        return jsonify({})
+
+    @app.route("/dialog/orgunit")
+    def org_unit_dialog():
+        return """<html><body><div><div>Organizational unit</div><div><form>
+<div></div><div></div><div><select><option>Spartao</option></select></div>
+<div><input type="button" value="Select" onclick="window.top.closeDialog()"/><input type="button" value="Cancel" onclick="window.top.closeDialog()"/></div>
+</form></div></div></body></html>"""
+
+    @app.route("/dialog/processor")
+    def processor_dialog():
+        item = invoice(request.args["vendor"], request.args["invoice_num"])
+        base = f"/invoice/{item['vendor']}/{item['invoice_num']}"
+        approvers = [approver for _, _, approver in LOCATIONS]
+        current = [f"Approve: {name}" for name in item["processors"]]
+        return f"""<html><head>{_POST_SCRIPT % base}<script>
+function addProcessor() {{
+    var list = document.getElementById("ProcessorList");
+    var current = document.getElementById("CurrentProcessors");
+    if (list.selectedIndex < 0) return;
+    current.add(new Option("Approve: " + list.options[list.selectedIndex].text));
+}}
+function confirmProcessors() {{
+    var names = Array.prototype.map.call(
+        document.getElementById("CurrentProcessors").options,
+        function (option) {{ return option.text.replace("Approve: ", ""); }});
+    send("processors", {{processors: names}}).then(function () {{
+        window.top.closeDialog();
+    }});
+}}
+</script></head><body><div><div>Processors</div><div><form>
+<div></div><div></div>
+<div><table><tbody>
+<tr><th>Users</th><th></th><th>Processors</th></tr>
+<tr><td><div><select id="ProcessorList" size="5">{_options(approvers)}</select></div></td>
+<td><table><tbody><tr><td><table><tbody><tr><td><input type="button" value="Add" onclick="addProcessor()"/></td></tr></tbody></table></td></tr></tbody></table></td>
+<td><div><select id="CurrentProcessors" size="5">{_options(current)}</select></div></td></tr>
+</tbody></table></div>
+<div><input type="button" value="OK" onclick="confirmProcessors()"/><input type="button" value="Cancel" onclick="window.top.closeDialog()"/></div>
+</form></div></div></body></html>"""
+
+    # SharePoint, the endpoints used by shareplum's Site and Folder.
+    @app.route(f"{SITE_PATH}/_vti_bin/<name>", methods=["POST"])
+    def soap(name):
+        return "<E><B><R><Res>mock<L><D></D></L></Res></R></B></E>"
+
+    @app.route(f"{SITE_PATH}/_api/contextinfo", methods=["POST"])
+    def context_info():
+        return jsonify(FormDigestValue="digest")
+
+    @app.route(f"{SITE_PATH}/_api/web/folders", methods=["POST"])
+    def folders():
+        url = request.get_json(force=True)["ServerRelativeUrl"]
+        return jsonify(d={"ServerRelativeUrl": f"{SITE_PATH}/{url}"})
+
+    @app.route(f"{SITE_PATH}/_api/web/<path:rest>", methods=["GET", "POST"])
+    def web(rest):
+        added = re.search(r"Files/add\(url='(.+?)'", rest)
+        if added:
+            with store.lock:
+                store.files[added.group(1)] = request.get_data()
+            return jsonify({})
+        wanted = re.search(r"GetFileByServerRelativeUrl\('.*/(.+?)'\)/\$value", rest)
+        if wanted:
+            with store.lock:
+                content = store.files.get(wanted.group(1))
+            if content is None:
+                abort(404)
+            return content
+        if rest.endswith("/files"):
+            with store.lock:
+                files = [
+                    {"Name": name, "ETag": hashlib.sha1(content).hexdigest()}
+                    for name, content in store.files.items()
+                ]
+            return jsonify(value=files)
+        abort(404)
+
+    return app
+
+
+class MockServer:
+    """
+    The mock served on a local port from a background thread.
+    """
+
+    def __init__(self, store, host="127.0.0.1", port=0):
+        self.store = store
+        # One access log line per request would drown the bot's log.
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        self._server = make_server(host, port, create_app(store), threaded=True)
+        self.url = f"http://{host}:{self._server.server_port}"
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="mock-basware", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+    def site_factory(self):
+        """
+        Return a shareplum site of the mock SharePoint, authenticated with its cookie.
+        """
+        cookies = requests.cookies.RequestsCookieJar()
+        cookies.set(SHAREPOINT_COOKIE, self.store.sharepoint_token)
+        return Site(f"{self.url}{SITE_PATH}", version=Version.v365, authcookie=cookies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--invoices", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--vendors", nargs="+", default=["1566645"])
+    args = parser.parse_args()
+
+    invoices = synthetic_invoices(args.invoices, vendors=args.vendors)
+    server = MockServer(
+        MockStore(invoices, latency=args.latency),
+        port=args.port,
+    )
+    print(
+        f"Mock Basware at {server.url}/login, SharePoint site {server.url}{SITE_PATH}"
+    )
+    print(f"SharePoint cookie {SHAREPOINT_COOKIE}={server.store.sharepoint_token}")
+    server._server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark of utils.text_utils.normalize_text against the sequential
+str.replace normalization info_extractor used before.
+
+Usage:
+    python -m benchmarks.normalization_benchmark [--pages 8] [--repeat 200]
+"""
+
+import argparse
+import random
+import re
+import timeit
+
+from utils.text_utils import normalize_text
+
+
+def legacy_normalize(text):
+    text = text.replace("\n", " ").replace("\r", "").lower()
+    text = text.replace("(", " ").replace(")", " ")
+    text = text.replace("/", " ")
+    text = text.replace("espoon keskus", "espoonkeskus")
+    text = " ".join(text.split())
+    text = text.replace(" cid:228 ", "ä").replace("sm-", "").replace("vakka-", "vakka")
+    text = text.replace(str("Tuottajantie 41, 60100 SEINÄJOKI").lower(), "")
+    text = text.replace(str("60100 SEINÄJOKI").lower(), "")
+    text = text.replace(str("Kotipaikka: SEINÄJOKI").lower(), "")
+    text = text.replace(str("helsingin mylly").lower(), "")
+    text_list = set(re.sub(r"[^a-zA-Z öä-˜]", "", text).split(" "))
+    return text, text_list
+
+
+def sample_invoice_text(pages, seed=0):
+    """
+    Build invoice-like text: a header, product rows per page and a VAT summary.
+    """
+    rng = random.Random(seed)
+    products = ["Lohifilee", "Riisi (Japonica)", "Soijakastike", "Wasabi/tahna"]
+    lines = [
+        "LASKU / FAKTURA",
+        "Oy Golden Crop AB Tuottajantie 41, 60100 SEINÄJOKI",
+        "Toimitusosoite: SM-Sushibar Espoon Keskus",
+        "Kotipaikka: SEINÄJOKI  Y-tunnus 1234567-8",
+    ]
+    for page in range(pages):
+        for row in range(60):
+            product = rng.choice(products)
+            quantity = rng.randint(1, 40)
+            price = rng.uniform(1, 90)
+            lines.append(
+                f"{page * 60 + row:05d}\t{product}  {quantity} kpl  "
+                f"{price:.2f} 14,00 % {quantity * price:.2f}\r"
+            )
+        lines.append(f"Sivu {page + 1} / {pages} cid:228 helsingin mylly")
+    lines.append("ALV-erittely Verokanta 14 % 1234,50 172,83 1407,33")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    text = sample_invoice_text(args.pages)
+    legacy_text, legacy_tokens = legacy_normalize(text)
+    normalized = normalize_text(text)
+    if normalized.text != legacy_text or set(normalized.tokens) != legacy_tokens:
+        raise SystemExit("normalize_text output differs from the legacy sequence")
+
+    print(f"Invoice text: {len(text)} characters, {args.pages} pages")
+    for name, function in (
+        ("legacy replace chain", legacy_normalize),
+        ("normalize_text", normalize_text),
+    ):
+        best = min(timeit.repeat(lambda: function(text), number=args.repeat, repeat=5))
+        print(f"{name:>22}: {best / args.repeat * 1e6:9.1f} µs per invoice")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Benchmark and regression check of extractor.info_extractor over a golden corpus of
+invoice texts, covering every vendor parser with each VAT line combination its layout
+has, credit notes and multi-page invoices.
+
+For every vendor it reports the time of info_extractor (normalization, location
+matching and parsing) and of the vendor parser alone per invoice, and the peak memory
+allocated while extracting its invoices, traced with tracemalloc. It also reports how
+many outputs match the posting information the invoices were generated with.
+
+It fails when an output differs from the golden baseline, or when a vendor's
+info_extractor time exceeds the time recorded on this machine by more than the
+threshold. Only the outputs are committed: times are comparable only on the machine
+that recorded them, so record them locally with --record-timings before changing a
+parser, the normalization or the location matching. Vendors without a recorded time
+are not timed against one.
+
+The corpus holds the text of the vendor's region and of the whole document of PDFs
+from benchmarks.synthetic_invoices, before normalization, so normalization changes are
+covered too.
+
+Usage:
+    python -m benchmarks.parser_benchmark [--repeat 50] [--threshold 1.5]
+        [--vendors 1381774 1433275] [--record-timings] [--update-baseline]
+        [--regenerate-corpus]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from collections import defaultdict
+from functools import partial
+
+import pandas as pd
+
+from benchmarks.synthetic_invoices import (
+    DEFAULT_LOCATIONS,
+    LAYOUTS,
+    generate_corpus,
+    matches_expected,
+)
+from extractor import info_extractor
+from models.vendor_parsers import get_parser
+from utils.pdf_utils import extract_pdf_pages, extract_pdf_text
+from utils.text_utils import normalize_text
+
+GOLDEN_DIRECTORY = os.path.join(os.path.dirname(__file__), "golden")
+CORPUS_PATH = os.path.join(GOLDEN_DIRECTORY, "parser_corpus.json")
+BASELINE_PATH = os.path.join(GOLDEN_DIRECTORY, "parser_baseline.json")
+TIMINGS_PATH = os.getenv(
+    "PARSER_TIMINGS_PATH",
+    os.path.join(os.getenv("CACHE_DIRECTORY", "cache"), "parser_timings.json"),
+)
+
+# Time differences below this many microseconds per invoice are noise, not regressions.
+MIN_TIME_DIFFERENCE_US = 5
+
+
+def build_corpus(seed=0, per_vendor=400):
+    """
+    Generate the corpus: for every vendor, a single and a multi-page invoice of each
+    combination of VAT lines and credit note the layout has.
+
+    Returns:
+    - dict: The 'locations' of the master data and the 'cases', each with its 'name',
+      'vendor', the extracted 'region_text' and document 'text', and the 'expected'
+      posting information.
+    """
+    locations = pd.DataFrame(
+        DEFAULT_LOCATIONS, columns=["External ID", "bw_matching", "bw_approver"]
+    )
+    cases = []
+    for vendor in LAYOUTS:
+        seen = set()
+        for invoice in generate_corpus(per_vendor, locations, [vendor], seed):
+            variant = (tuple(invoice["rates"]), invoice["credit"], invoice["pages"] > 1)
+            if variant in seen:
+                continue
+            seen.add(variant)
+            name = "-".join(
+                [vendor, *invoice["rates"]]
+                + (["credit"] if invoice["credit"] else [])
+                + [f"{invoice['pages']}p"]
+            )
+            region = get_parser(vendor).region
+            region_text = "".join(
+                text for _, text in extract_pdf_text(invoice["pdf"], region)
+            )
+            text = "".join(text for _, text in extract_pdf_pages(invoice["pdf"]))
+            cases.append(
+                {
+                    "name": name,
+                    "vendor": vendor,
+                    "text": text,
+                    "region_text": region_text,
+                    "expected": invoice["posting_info"],
+                }
+            )
+    return {"locations": DEFAULT_LOCATIONS, "cases": cases}
+
+
+def _time_per_call(function, repeat):
+    # Best of five runs of the given number of calls, in microseconds per call.
+    best = None
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / repeat * 1e6
+
+
+def run(corpus, repeat, vendors=None):
+    """
+    Extract every case of the corpus and measure every vendor.
+
+    Returns:
+    - dict: The JSON-compatible 'outputs' by case name, and by vendor the 'cases', the
+      outputs 'correct' against the expected posting information, the 'extract_us'
+      and 'parse_us' per invoice and the 'peak_kib' allocated.
+    """
+    locations = pd.DataFrame(
+        corpus["locations"], columns=["External ID", "bw_matching", "bw_approver"]
+    )
+    by_vendor = defaultdict(list)
+    for case in corpus["cases"]:
+        if not vendors or case["vendor"] in vendors:
+            by_vendor[case["vendor"]].append(case)
+
+    outputs = {}
+    results = {}
+    for vendor, cases in by_vendor.items():
+        parser = get_parser(vendor)
+        normalized = [normalize_text(case["region_text"]).text for case in cases]
+        correct = 0
+        for case in cases:
+            output = info_extractor(
+                case["region_text"], vendor, locations, partial(str, case["text"])
+            )
+            # Round-tripped so outputs compare equal to the ones read from the baseline.
+            outputs[case["name"]] = json.loads(json.dumps(output))
+            correct += not matches_expected(output, case["expected"])
+
+        def extract():
+            for case in cases:
+                info_extractor(
+                    case["region_text"], vendor, locations, partial(str, case["text"])
+                )
+
+        def parse():
+            for case, text in zip(cases, normalized):
+                parser.parse(text, {"location": case["expected"]["location"]})
+
+        tracemalloc.start()
+        extract()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[vendor] = {
+            "cases": len(cases),
+            "correct": correct,
+            "extract_us": round(_time_per_call(extract, repeat) / len(cases), 2),
+            "parse_us": round(_time_per_call(parse, repeat) / len(cases), 2),
+            "peak_kib": round(peak / 1024, 1),
+        }
+    return {"outputs": outputs, "vendors": results}
+
+
+def regressions(result, baseline, timings, threshold):
+    """
+    Return the outputs that differ from the baseline and the vendors whose
+    info_extractor time exceeds their recorded time by more than the threshold.
+    """
+    problems = []
+    for name, output in result["outputs"].items():
+        if name not in baseline["outputs"]:
+            problems.append(f"{name}: no baseline output")
+        elif output != baseline["outputs"][name]:
+            problems.append(
+                f"{name}: output {output!r} != baseline {baseline['outputs'][name]!r}"
+            )
+    for vendor, stats in result["vendors"].items():
+        previous = timings.get(vendor)
+        if previous is None:
+            continue
+        limit = previous["extract_us"] * threshold
+        if (
+            stats["extract_us"] > limit
+            and stats["extract_us"] - previous["extract_us"] > MIN_TIME_DIFFERENCE_US
+        ):
+            problems.append(
+                f"{vendor}: {stats['extract_us']} µs per invoice, recorded "
+                f"{previous['extract_us']} µs (limit {limit:.2f} µs)"
+            )
+    return problems
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(content, f, indent=1, ensure_ascii=False)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.5,
+        help="fail when a vendor is slower than this multiple of its recorded time",
+    )
+    parser.add_argument("--vendors", nargs="+")
+    parser.add_argument(
+        "--record-timings",
+        action="store_true",
+        help=f"record the times of this machine in {TIMINGS_PATH}",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="update the golden outputs, and record the times of this machine",
+    )
+    parser.add_argument(
+        "--regenerate-corpus",
+        action="store_true",
+        help="regenerate the corpus from benchmarks.synthetic_invoices",
+    )
+    args = parser.parse_args()
+
+    if args.regenerate_corpus:
+        _write(CORPUS_PATH, build_corpus())
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    result = run(corpus, args.repeat, args.vendors)
+    baseline = _read(BASELINE_PATH)
+    timings = _read(TIMINGS_PATH) or {}
+
+    print(
+        f"  {'vendor':<10} {'cases':>5} {'correct':>7} {'extract µs':>11} "
+        f"{'recorded':>9} {'parse µs':>9} {'peak KiB':>9}"
+    )
+    for vendor, stats in result["vendors"].items():
+        previous = timings.get(vendor, {})
+        print(
+            f"  {vendor:<10} {stats['cases']:>5} {stats['correct']:>7} "
+            f"{stats['extract_us']:>11.2f} {previous.get('extract_us', '-'):>9} "
+            f"{stats['parse_us']:>9.2f} {stats['peak_kib']:>9.1f}"
+        )
+
+    if args.update_baseline or args.record_timings:
+        timings.update(result["vendors"])
+        _write(TIMINGS_PATH, timings)
+        print(f"Timings written to {TIMINGS_PATH}")
+    if args.update_baseline:
+        outputs = result["outputs"]
+        if baseline is not None and args.vendors:
+            outputs = {**baseline["outputs"], **outputs}
+        _write(BASELINE_PATH, {"outputs": outputs})
+        print(f"Baseline written to {BASELINE_PATH}")
+    if args.update_baseline or args.record_timings:
+        return 0
+    if baseline is None:
+        print(f"No baseline in {BASELINE_PATH}, record it with --update-baseline.")
+        return 1
+    if not timings:
+        print(f"No timings in {TIMINGS_PATH}, only the outputs are checked.")
+
+    problems = regressions(result, baseline, timings, args.threshold)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    print(f"{len(problems)} regressions in {len(result['outputs'])} invoices.")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
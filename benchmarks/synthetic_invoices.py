@@ -0,0 +1,523 @@
+"""
+Synthetic invoice PDFs reproducing the VAT summary layout of every vendor in
+config.re_pattern_config.expressions, each with the posting_info the extraction is
+expected to return, for use as a correctness oracle and as a throughput corpus.
+
+Invoices vary in page count, VAT lines (14% only, 25.5% only, both, and credit notes
+with negative amounts, where the vendor's layout has them) and location, taken from
+the 'Location' master data. Locations the extractor rewrites (the firewok, vendor and
+approver overrides) are not used, so the expected location is the one printed.
+
+Usage:
+    python -m benchmarks.synthetic_invoices --output corpus [--count 1000]
+        [--vendors 1381774 1433275] [--master-data master_data.xlsx] [--seed 0]
+
+Writes one PDF per invoice and expected.json, the list of their vendor, invoice
+number, file name and expected posting_info.
+"""
+
+import os
+import json
+import random
+import argparse
+from collections import namedtuple
+
+import pandas as pd
+
+from config.re_pattern_config import get_expressions, get_regions
+from models.location_index import LocationIndex
+from models.vendor_parsers import PARSER_CLASSES
+from utils.text_utils import normalize_text
+
+# Locations used without master data: (External ID, name matched in the PDF, approver).
+# L101 has posting dimensions in config.posting_config.LOCATION_DIMENSIONS.
+DEFAULT_LOCATIONS = [
+    ("L10", "kamppi", "Virtanen, Anna"),
+    ("L11", "tapiola", "Korhonen, Mikko"),
+    ("L12", "itäkeskus", "Mäkinen, Laura"),
+    ("L101", "tikkurila", "Nieminen, Juha"),
+]
+
+# Locations info_extractor rewrites, besides the vendor and approver overrides.
+_REWRITTEN_LOCATIONS = {"L43", "L44", "L56"}
+
+# VAT rates by posting_info key, in percent.
+RATES = {"14": 14, "24": 25.5, "0": 0}
+
+VatLine = namedtuple("VatLine", ["rate", "net", "vat"])
+
+LAYOUTS = {}
+
+
+def layout(*vendor_ids, rates=(("14",), ("24",), ("14", "24")), credit=True):
+    """
+    Decorator registering the VAT summary layout of one or more vendors.
+
+    The layout function returns the text lines of the summary for a list of VatLine,
+    with amounts in cents.
+
+    Parameters:
+    - rates: The combinations of VAT rates the layout can show.
+    - credit (bool): Whether the layout can show a credit note.
+    """
+
+    def decorator(function):
+        for vendor_id in vendor_ids:
+            LAYOUTS[vendor_id] = (function, rates, credit)
+        return function
+
+    return decorator
+
+
+def _amount(cents, decimal=",", thousands=""):
+    sign = "-" if cents < 0 else ""
+    whole, fraction = divmod(abs(cents), 100)
+    grouped = f"{whole:,}".replace(",", thousands)
+    return f"{sign}{grouped}{decimal}{fraction:02d}"
+
+
+def _rate(key, decimal=","):
+    rate = RATES[key]
+    return str(rate).replace(".", decimal) if rate % 1 else str(int(rate))
+
+
+def _total(line):
+    return line.net + line.vat
+
+
+@layout("1381774")
+def _s_business(lines):
+    rows = [
+        f"{_rate(l.rate, '.')} {_amount(l.vat, '.')} {_amount(l.net, '.')} "
+        f"{_amount(_total(l), '.')}"
+        for l in lines
+    ]
+    net = sum(l.net for l in lines)
+    return [
+        "ALV % ALV yht. ALV 0 % yht. sis. ALV",
+        *rows,
+        f"Yhteensä ALV 0% {_amount(net, '.')}",
+    ]
+
+
+@layout("1367729", rates=(("24",),))
+def _metos(lines):
+    (line,) = lines
+    return [
+        f"Veroton loppusumma {_amount(line.net, thousands=' ')}",
+        f"Arvonlisävero 25,50 % {_amount(line.vat, thousands=' ')}",
+        f"Yhteensä EUR {_amount(_total(line), thousands=' ')}",
+        "METOS Oy Ab, Y-tunnus 0115130-5",
+    ]
+
+
+@layout("1578999")
+def _golden_crop(lines):
+    rows = [
+        f"{_rate(l.rate, '.')}% {_amount(l.net, '.', ',')} € {_amount(l.vat, '.', ',')} €"
+        for l in lines
+    ]
+    return ["Tax base amount VAT", *rows, "Payment terms 14 days net"]
+
+
+@layout("1394052", "1389643", rates=(("14",),))
+def _freshfish(lines):
+    (line,) = lines
+    return [
+        f"Veroton summa {_amount(line.net, thousands='.')} €",
+        f"ALV 14,00 % {_amount(line.vat, thousands='.')} €",
+        f"Lasku yhteensä {_amount(_total(line), thousands='.')} €",
+    ]
+
+
+@layout("1426362", rates=(("14",),))
+def _kalaneuvos(lines):
+    (line,) = lines
+    return [
+        "_____________",
+        f"{_amount(line.net, thousands='.')} ALV 14,00% SUMMA EUR {_amount(line.vat, thousands='.')}",
+        "_____________",
+    ]
+
+
+@layout("2000009", rates=(("14",),))
+def _fisu_pojat(lines):
+    (line,) = lines
+    return [
+        "Veroton Vero Yhteensä",
+        f"14% {_amount(line.net)} {_amount(line.vat)} {_amount(_total(line))}",
+        "Kiitos tilauksestanne",
+    ]
+
+
+@layout("1276917", "1375629")
+def _alv_erittely(lines):
+    rows = " ".join(
+        f"{RATES[l.rate]:.2f}%".replace(".", ",") + f" {_amount(l.net)} "
+        f"alv: {_amount(l.vat)}"
+        for l in lines
+    )
+    return [f"ALV-erittely: netto: {rows}", "Yhteensä"]
+
+
+@layout("1714901", rates=(("14",), ("24",), ("14", "24")))
+def _agrica(lines):
+    rows = [
+        f"{_rate(l.rate, '.')} {_amount(l.net, '.')} {_amount(l.vat, '.')} "
+        f"{_amount(_total(l), '.')}"
+        for l in lines
+    ]
+    net, vat = sum(l.net for l in lines), sum(l.vat for l in lines)
+    return [
+        "Arvonlisäveroerittely: ALV % Netto Vero Brutto",
+        "Specifikation av mervärdesskatt: MVS % Skatt",
+        *rows,
+        f"{_amount(net, '.')} {_amount(vat, '.')} {_amount(net + vat, '.')}",
+        "Yhteensä EUR",
+    ]
+
+
+@layout("1566645", rates=(("24",),))
+def _yellow_service(lines):
+    (line,) = lines
+    return [
+        "Verokanta Veroton Vero Yhteensä",
+        f"25,5 {_amount(line.net)} {_amount(line.vat)} {_amount(_total(line))}",
+        "Maksuehto 14 pv netto",
+    ]
+
+
+@layout("1433275")
+def _kesko(lines):
+    # Both rates are listed with the 25.5% rate first.
+    ordered = sorted(lines, key=lambda l: l.rate != "24")
+    rows = [
+        f"{_amount(l.net)} {_rate(l.rate)} {_amount(l.vat)} {_amount(_total(l))}"
+        for l in ordered
+    ]
+    return ["ALV erittely", "Veron peruste ALV % Vero Verollinen", *rows, "Kiitos"]
+
+
+@layout("1553180")
+def _hartwall(lines):
+    # The layout labels the general rate 24 %.
+    rows = [
+        f"{l.rate} % {_amount(l.net)} {_amount(l.vat)} {_amount(_total(l))}"
+        for l in lines
+    ]
+    return [f"ALV-erittely verokanta {' '.join(rows)}", "Maksettava yhteensä"]
+
+
+@layout(
+    "2000224",
+    rates=(("14",), ("24",), ("14", "24"), ("0", "14"), ("0", "24"), ("0", "14", "24")),
+)
+def _finblu(lines):
+    net = sum(l.net for l in lines)
+    rows = [f"Arvonlisävero {_rate(l.rate)} % {_amount(l.vat)}" for l in lines]
+    return [f"Yhteensäilman arvonlisäveroa {_amount(net)}", *rows, "Yhteensä"]
+
+
+@layout("1357805", "2000219")
+def _spartao(lines):
+    # The layout labels the general rate 24%.
+    rows = [f"{l.rate}% {_amount(l.net)} EUR {_amount(l.vat)} EUR" for l in lines]
+    return ["Veroprosentti Veron peruste Veron määrä", *rows, "Yhteensä"]
+
+
+@layout("1301716", rates=((),), credit=False)
+def _tingstad(lines):
+    return ["Betalningsvillkor 30 dagar netto"]
+
+
+def expected_posting_info(vendor, location, approver, lines):
+    """
+    The posting information of an invoice: its location, its approver when the vendor's
+    invoices are approved by the location manager, and the net, VAT and total of each
+    VAT rate, without zero amounts.
+    """
+    expected = {"location": location}
+    if get_expressions()[vendor][2] == "manager":
+        expected["approver"] = approver
+    if vendor == "1301716":
+        return expected
+    if vendor == "2000224":
+        # Only the VAT of each rate and the combined net are printed, so the net of
+        # the 25.5% rate is derived from its VAT when both rates are present. The net
+        # of a 0% line stays in the net of the other rates.
+        expected["net"] = sum(l.net for l in lines) / 100
+        vats = {l.rate: l.vat / 100 for l in lines}
+        expected.update(vats)
+        vats.pop("0", None)
+        if len(vats) == 1:
+            (rate,) = vats
+            nets = {rate: expected["net"]}
+        else:
+            nets = {"24": round(vats["24"] / 0.255, 2)}
+            nets["14"] = round(expected["net"] - nets["24"], 2)
+        for rate, net in nets.items():
+            expected[f"{rate}_net"] = net
+            expected[f"{rate}_total"] = round(net + vats[rate], 2)
+        return {key: value for key, value in expected.items() if value != 0}
+    for line in lines:
+        expected[f"{line.rate}_net"] = line.net / 100
+        expected[line.rate] = line.vat / 100
+        expected[f"{line.rate}_total"] = _total(line) / 100
+    return {key: value for key, value in expected.items() if value != 0}
+
+
+def matches_expected(posting_info, expected, tolerance=0.005):
+    """
+    Return the differences between extracted and expected posting information, amounts
+    compared within the tolerance.
+
+    Returns:
+    - list: A description of every missing, unexpected or different key.
+    """
+    if not isinstance(posting_info, dict):
+        return [f"no posting information: {posting_info!r}"]
+    differences = []
+    for key in sorted(set(posting_info) | set(expected), key=str):
+        if key == "INV No.":
+            continue
+        if key not in posting_info:
+            differences.append(f"{key} missing, expected {expected[key]!r}")
+        elif key not in expected:
+            differences.append(f"{key} unexpected: {posting_info[key]!r}")
+        elif isinstance(expected[key], float):
+            try:
+                if abs(float(posting_info[key]) - expected[key]) > tolerance:
+                    raise ValueError
+            except (TypeError, ValueError):
+                differences.append(
+                    f"{key} is {posting_info[key]!r}, expected {expected[key]!r}"
+                )
+        elif posting_info[key] != expected[key]:
+            differences.append(
+                f"{key} is {posting_info[key]!r}, expected {expected[key]!r}"
+            )
+    return differences
+
+
+def make_pdf(pages):
+    """
+    Minimal PDF with one page of Helvetica text lines per list of lines.
+
+    Parameters:
+    - pages (list): A list of text lines per page.
+
+    Returns:
+    - bytes: The PDF document.
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+        b"/Encoding /WinAnsiEncoding >>",
+    ]
+    kids = []
+    for lines in pages:
+        shown = " ".join(
+            "(%s) '"
+            % line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            for line in lines
+        )
+        stream = f"BT /F1 10 Tf 40 800 Td 12 TL {shown} ET".encode("cp1252")
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids),
+        len(kids),
+    )
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return pdf
+
+
+def master_locations(master_location=None):
+    """
+    The locations invoices are generated for, from the 'Location' master data.
+
+    Returns:
+    - list: (External ID, matching key, approver) of every location whose first matching
+      key is matched to it, and which the extractor does not rewrite.
+    """
+    if master_location is None:
+        master_location = pd.DataFrame(
+            DEFAULT_LOCATIONS, columns=["External ID", "bw_matching", "bw_approver"]
+        )
+    from extractor import APPROVER_OVERRIDES
+
+    rewritten = set(_REWRITTEN_LOCATIONS) | set(APPROVER_OVERRIDES)
+    for parser_class in PARSER_CLASSES.values():
+        rewritten |= set(parser_class.location_overrides)
+    index = LocationIndex.from_dataframe(master_location)
+    locations = []
+    for matching, external_id in zip(
+        master_location["bw_matching"], master_location["External ID"]
+    ):
+        approver = index.approver(external_id)
+        if not isinstance(matching, str) or not isinstance(approver, str):
+            continue
+        if external_id in rewritten:
+            continue
+        key = matching.split(",")[0].strip()
+        try:
+            key.encode("cp1252")
+        except UnicodeEncodeError:
+            continue
+        if key and index.match(normalize_text(key).tokens) == external_id:
+            locations.append((external_id, key, approver))
+    return locations
+
+
+def _vat_lines(rng, rates, credit):
+    lines = []
+    for rate in rates:
+        net = rng.randint(1_000, 500_000)
+        lines.append(VatLine(rate, net, round(net * RATES[rate] / 100)))
+    if credit:
+        lines = [VatLine(l.rate, -l.net, -l.vat) for l in lines]
+    return lines
+
+
+def _item_lines(rng, count):
+    return [
+        f"{rng.randint(10000, 99999)} Tuote {rng.randint(1, 999)} "
+        f"{rng.randint(1, 40)} kpl {_amount(rng.randint(100, 99_999))}"
+        for _ in range(count)
+    ]
+
+
+def generate_invoice(vendor, invoice_num, rng, locations):
+    """
+    Generate an invoice PDF of the vendor with a random location, page count and
+    VAT lines supported by the vendor's layout.
+
+    Returns:
+    - dict: 'vendor', 'invoice_num', 'location', 'approver', 'pages', 'rates',
+      'credit', 'pdf' and the expected 'posting_info'.
+    """
+    summary, rate_choices, can_credit = LAYOUTS[vendor]
+    location, key, approver = rng.choice(locations)
+    rates = rng.choice(rate_choices)
+    credit = can_credit and rng.random() < 0.15
+    lines = _vat_lines(rng, rates, credit)
+    page_count = rng.choice((1, 1, 1, 2, 2, 3, 4))
+    if get_regions().get(vendor, {}).get("pages") == "first":
+        page_count = 1
+
+    name = get_expressions()[vendor][0]
+    document = "Hyvityslasku" if credit else "Lasku"
+    pages = [
+        [
+            name,
+            f"{document} {invoice_num}",
+            f"Toimitusosoite: {key.title()}",
+            f"Päivämäärä {rng.randint(1, 28)}.{rng.randint(1, 12)}.2026",
+            *_item_lines(rng, rng.randint(3, 12)),
+        ]
+    ]
+    for _ in range(page_count - 1):
+        pages.append(_item_lines(rng, rng.randint(20, 45)))
+    pages[-1].extend(summary(lines))
+    for number, page in enumerate(pages, 1):
+        page.append(f"Sivu {number} / {page_count}")
+
+    return {
+        "vendor": vendor,
+        "invoice_num": invoice_num,
+        "location": location,
+        "approver": approver,
+        "pages": page_count,
+        "rates": list(rates),
+        "credit": credit,
+        "pdf": make_pdf(pages),
+        "posting_info": expected_posting_info(vendor, location, approver, lines),
+    }
+
+
+def generate_corpus(count, master_location=None, vendors=None, seed=0):
+    """
+    Generate invoices of the vendors in turn.
+
+    Parameters:
+    - count (int): Number of invoices.
+    - master_location (DataFrame): 'Location' master data, defaults to DEFAULT_LOCATIONS.
+    - vendors (list): Vendor IDs, defaults to every vendor of the expressions.
+    - seed (int): Seed of the random generator, the same seed gives the same corpus.
+
+    Yields:
+    - dict: The generate_invoice result of each invoice.
+    """
+    rng = random.Random(seed)
+    vendors = list(vendors or get_expressions())
+    locations = master_locations(master_location)
+    if not locations:
+        raise ValueError("No usable location in the master data.")
+    for number in range(count):
+        vendor = vendors[number % len(vendors)]
+        yield generate_invoice(vendor, str(900000 + number), rng, locations)
+
+
+def write_corpus(invoices, output):
+    """
+    Write the PDFs of the invoices and their expected.json to the output folder.
+
+    Returns:
+    - list: The expected.json entries.
+    """
+    os.makedirs(output, exist_ok=True)
+    manifest = []
+    for invoice in invoices:
+        file_name = f"{invoice['vendor']}_{invoice['invoice_num']}.pdf"
+        with open(os.path.join(output, file_name), "wb") as f:
+            f.write(invoice["pdf"])
+        manifest.append(
+            {
+                "file": file_name,
+                **{key: value for key, value in invoice.items() if key != "pdf"},
+            }
+        )
+    with open(os.path.join(output, "expected.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--vendors", nargs="*")
+    parser.add_argument("--master-data", help="Excel file with a 'Location' sheet")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    master_location = None
+    if args.master_data:
+        master_location = pd.read_excel(args.master_data, sheet_name="Location")
+    manifest = write_corpus(
+        generate_corpus(args.count, master_location, args.vendors, args.seed),
+        args.output,
+    )
+    print(f"{len(manifest)} invoices written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
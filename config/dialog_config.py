@@ -0,0 +1,62 @@
+from selenium.webdriver.common.by import By
+
+# Seconds an optional dialog is probed for before it is taken as not shown, unless
+# DIALOG_PROBE_TIMEOUT is set. The probe returns as soon as a dialog is shown, only
+# absent dialogs wait this long.
+PROBE_TIMEOUT = 1.5
+
+# Dialogs Basware shows only sometimes. The first step of a dialog is probed
+# without waiting; the remaining steps are waited for once the dialog is shown.
+# A dialog may declare its own probe "timeout", ended early once its "ready"
+# element (iframe name, locator) is shown, as the dialog can no longer follow.
+OPTIONAL_DIALOGS = {
+    "lock_override": {
+        "iframe": "error_iframe",
+        # The lock dialog can take longer than PROBE_TIMEOUT to show while the invoice
+        # opens. It is shown before the invoice info page is ready to be edited.
+        "timeout": 10,
+        "ready": (
+            "info_iframe",
+            (
+                By.XPATH,
+                "/html/body/form/div[3]/div[1]/div[2]/table/tbody/tr[2]/td[2]/div/div/button",
+            ),
+        ),
+        "steps": [
+            (
+                (By.XPATH, "/html/body/div/div[4]/input[1]"),
+                "try to override the lock frame and click",
+            ),
+        ],
+    },
+    "dont_show_next_time": {
+        "iframe": "error_iframe",
+        "steps": [
+            (
+                (By.XPATH, "/html/body/div/div[3]/span/label"),
+                "find the show next time check and click",
+            ),
+            (
+                (By.XPATH, '//*[@id="yesbutton"]'),
+                "find the don't show next time check and click",
+            ),
+        ],
+    },
+    "dont_show_next_time_confirm": {
+        "iframe": "error_iframe",
+        "steps": [
+            (
+                (By.XPATH, "/html/body/div/div[3]/span/label"),
+                "find the show next time check and click",
+            ),
+            (
+                (By.XPATH, '//*[@id="yesbutton"]'),
+                "find the don't show next time check and click",
+            ),
+            (
+                (By.XPATH, "/html/body/div/div[5]/input"),
+                "find the don't show next time check and click",
+            ),
+        ],
+    },
+}
@@ -0,0 +1,26 @@
+# Rules used to normalize the text extracted from invoice PDFs before matching.
+
+# Characters replaced (or removed, with an empty string) before the text is lowercased
+# and its whitespace collapsed.
+CHARACTER_RULES = {
+    "\n": " ",
+    "\r": "",
+    "(": " ",
+    ")": " ",
+    "/": " ",
+}
+
+# Phrase substitutions in order, written against lowercased text with single spaces.
+PHRASE_RULES = [
+    ("espoon keskus", "espoonkeskus"),
+    (" cid:228 ", "ä"),
+    ("sm-", ""),
+    ("vakka-", "vakka"),
+    ("tuottajantie 41, 60100 seinäjoki", ""),
+    ("60100 seinäjoki", ""),
+    ("kotipaikka: seinäjoki", ""),
+    ("helsingin mylly", ""),
+]
+
+# Characters kept when splitting the normalized text into location matching tokens.
+TOKEN_PATTERN = r"[^a-zA-Z öä-˜]"
@@ -0,0 +1,24 @@
+import os
+
+# VAT rates written as posting rows, in row order: key of the rate in the posting
+# information -> Basware tax code. The posting information holds the VAT amount of a
+# rate under its key, and the net and gross amounts under '<key>_net' and '<key>_total'.
+# The '24' key also holds the 25.5% rate. The tax code of the 0% rate has to be
+# configured before invoices with a 0% row can be posted.
+TAX_RATES = {
+    "14": "8",
+    "24": "6",
+    "0": os.getenv("POSTING_TAX_CODE_0"),
+}
+
+# Department and class posted with the location, by location External ID.
+LOCATION_DIMENSIONS = {
+    "L526": {"department": "D4"},
+    "L102": {"department": "D4"},
+    "L101": {"department": "D208", "class_code": "C7"},
+    "L76": {"department": "D208"},
+    "L67": {"department": "D208", "class_code": "C9"},
+    "L72": {"department": "D208", "class_code": "C9"},
+    "L531": {"department": "D208", "class_code": "C9"},
+    "L73": {"department": "D208", "class_code": "C1"},
+}
@@ -77,3 +77,36 @@ expressions = {
     ],
     "1301716": ["AB Tingstad Papper", r".*", "manager"],
 }
+
+
+def get_regions():
+    return regions
+
+
+# Part of the invoice PDF each vendor's expression needs, besides the first page
+# which is always extracted in full for location matching.
+# - "anchor": normalized phrase starting the VAT summary. The region starts at the
+#   last page containing it and runs to the end of the document. Without the
+#   anchor the whole document is extracted.
+# - "pages": "first" when only the first page is needed.
+# - "crop": optional (x0, top, x1, bottom) fractions of the page kept on the
+#   region pages, e.g. (0, 0.6, 1, 1) for the bottom 40%.
+# Vendors without an entry are extracted in full.
+regions = {
+    "1381774": {"anchor": "alv % alv yht."},
+    "1367729": {"anchor": "veroton loppusumma"},
+    "1578999": {"anchor": "tax base amount vat"},
+    "1394052": {"anchor": "veroton summa"},
+    "1426362": {"anchor": "alv 14,00% summa eur"},
+    "1389643": {"anchor": "veroton summa"},
+    "1276917": {"anchor": "alv-erittely: netto:"},
+    "1375629": {"anchor": "alv-erittely: netto:"},
+    "1714901": {"anchor": "arvonlisäveroerittely"},
+    "1566645": {"anchor": "verokanta veroton vero yhteensä"},
+    "1433275": {"anchor": "alv erittely veron peruste"},
+    "1553180": {"anchor": "alv-erittely verokanta"},
+    "2000224": {"anchor": "yhteensäilman"},
+    "1357805": {"anchor": "veroprosentti veron peruste"},
+    "2000219": {"anchor": "veroprosentti veron peruste"},
+    "1301716": {"pages": "first"},
+}
@@ -1,13 +1,30 @@
 # -*- coding: utf-8 -*-
 
 import os
-import re
-import pandas as pd
+import sys
+import json
+import time
+import hashlib
+import itertools
+import threading
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from dotenv import load_dotenv
 
 import pdfplumber
+import config.normalization_config
+import config.re_pattern_config
+import models.vendor_parsers
+import utils.pdf_utils
+import utils.text_utils
 from config.re_pattern_config import get_expressions
-from services.sharepoint import download_file
+from models.location_index import LocationIndex
+from models.vendor_parsers import get_parser
+from utils.cache_utils import ExtractionCache
+from utils.pdf_utils import extract_pdf_pages, extract_pdf_text
+from utils.text_utils import normalize_text
+from services.master_data import get_master_data
 
 load_dotenv()
 
@@ -18,15 +35,73 @@ DEBUG = False
 
 expressions = get_expressions()
 
-master_data = download_file(os.getenv("MASTER_DATA_PATH"))
-master_location = pd.read_excel(master_data, sheet_name="Location")
+# Locations remapped when the invoice is from the Firewok and not the Sushibar brand.
+BRAND_LOCATIONS = ("L56", "L43")
 
+APPROVER_OVERRIDES = {
+    "L4": "Seinäjoki, Sushibar",
+    "L5": "Seppälä, Sushibar",
+    "L24": "Lappeenranta, Sushibar",
+}
 
-def info_extractor(text, vendor, location_master_data=master_location):
+_location_index_cache = {"master_data": None, "index": None}
+
+extraction_cache = ExtractionCache(
+    os.getenv(
+        "EXTRACTION_CACHE_PATH",
+        os.path.join(os.getenv("CACHE_DIRECTORY", "cache"), "extraction.sqlite3"),
+    ),
+    max_bytes=int(os.getenv("EXTRACTION_CACHE_MAX_MB", 256)) * 1024 * 1024,
+)
+
+
+def _parser_version():
+    """
+    Hash of the modules the extracted text and posting information depend on,
+    so cached results are invalidated by any change to them.
+    """
+    digest = hashlib.sha256()
+    for module in (
+        sys.modules[__name__],
+        config.normalization_config,
+        config.re_pattern_config,
+        models.vendor_parsers,
+        utils.pdf_utils,
+        utils.text_utils,
+    ):
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+PARSER_VERSION = _parser_version()
+
+
+def get_location_index(location_master_data=None, version=None):
+    """
+    Return the LocationIndex for the given master data, building it only when the data changes.
+    Without master data, the 'Location' sheet of the lazily loaded master data is used.
+    """
+    if location_master_data is None:
+        location_master_data, version = get_master_data()
+    if _location_index_cache["master_data"] is not location_master_data:
+        _location_index_cache["index"] = LocationIndex.from_dataframe(
+            location_master_data,
+            approver_overrides=APPROVER_OVERRIDES,
+            version=version,
+        )
+        _location_index_cache["master_data"] = location_master_data
+    return _location_index_cache["index"]
+
+
+def info_extractor(text, vendor, location_master_data=None, document_text=None):
     """
     text: text extracted from pdf file.
     vendor: S-Business Oy or METOS OY AB, this option determines the vendor-specific regular expressions.
-    location_master_data: dictionary with key as the name of sushibar, value is the Netsuite location external ID.
+    location_master_data: 'Location' master data DataFrame, loaded from SharePoint when not given.
+    document_text: optional callable returning the text of every page, when text holds only
+        the first page and the vendor's region. It is only called when the location, or the
+        brand of a location remapped by brand, is not found in text.
     output: dictionary with following structure
         {
         "location":"External ID",
@@ -40,23 +115,24 @@ def info_extractor(text, vendor, location_master_data=master_location):
         "approver": "bw approver name"
         }
     """
-    text = text.replace("\n", " ").replace("\r", "").lower()
-    text = text.replace("(", " ").replace(")", " ")
-    text = text.replace("/", " ")
-    text = text.replace("espoon keskus", "espoonkeskus")
-    text = " ".join(text.split())
-    text = text.replace(" cid:228 ", "ä").replace("sm-", "").replace("vakka-", "vakka")
-    text = text.replace(str("Tuottajantie 41, 60100 SEINÄJOKI").lower(), "")
-    text = text.replace(str("60100 SEINÄJOKI").lower(), "")
-    text = text.replace(str("Kotipaikka: SEINÄJOKI").lower(), "")
-    text = text.replace(str("helsingin mylly").lower(), "")
-
-    if "firewok" in text.lower():
+    text, text_tokens = normalize_text(text)
+    location_index = get_location_index(location_master_data)
+    location = location_index.match(text_tokens)
+
+    location_text = text
+    if document_text is not None and (
+        location is None or (location in BRAND_LOCATIONS and "sushibar" not in text)
+    ):
+        # The address or the brand may be on a page outside the region.
+        location_text, text_tokens = normalize_text(document_text())
+        location = location_index.match(text_tokens)
+
+    if "firewok" in location_text:
         is_firewok = True
     else:
         is_firewok = False
 
-    if "sushibar" in text.lower():
+    if "sushibar" in location_text:
         is_sushibar = True
     else:
         is_sushibar = False
@@ -65,28 +141,11 @@ def info_extractor(text, vendor, location_master_data=master_location):
         print("Orignal text: ", text)
     output = {}
 
-    location_identifier = dict(
-        zip(master_location["bw_matching"], master_location["External ID"])
-    )
-    location_identifier_copy = {}
-    for k, v in location_identifier.items():
-        if isinstance(k, str):
-
-            splited_key = k.split(",")
-            if len(splited_key) != 1:
-                for i in splited_key:
-                    location_identifier_copy[i.strip()] = v
-            else:
-                location_identifier_copy[k.strip()] = v
-
-    text_list = set(re.sub(r"[^a-zA-Z öä-˜]", "", text).split(" "))
-    lication_identifier_set = set(location_identifier_copy.keys())
-    intersection_list = list(text_list.intersection(lication_identifier_set))
     if DEBUG:
-        print("Intersection list: ", intersection_list)
+        print("Location matches: ", location_index.find_all(text_tokens))
 
-    if len(intersection_list) >= 1:
-        output["location"] = location_identifier_copy[intersection_list[-1]]
+    if location is not None:
+        output["location"] = location
         if output["location"] == "L56" and is_firewok and not is_sushibar:
             output["location"] = "L67"
         if output["location"] == "L43" and is_firewok and not is_sushibar:
@@ -96,318 +155,218 @@ def info_extractor(text, vendor, location_master_data=master_location):
     else:
         print("Location not matched!")
 
-    loc_dict = dict(zip(master_location["External ID"], master_location["bw_approver"]))
-    loc_dict["L4"] = "Seinäjoki, Sushibar"
-    loc_dict["L5"] = "Seppälä, Sushibar"
-    loc_dict["L24"] = "Lappeenranta, Sushibar"
-    if expressions[vendor][2] == "manager":
-        output["approver"] = loc_dict[output["location"]]
-
-    price_pattern = re.compile(expressions[vendor][1])
-
-    matches = price_pattern.finditer(text)
+    parser = get_parser(vendor)
+    if parser.approver == "manager":
+        output["approver"] = location_index.approver(output["location"])
 
     try:
-        if vendor == "1381774":  # "S-Business Oy"
-            for i in matches:
-
-                if i.group(1):
-                    match = str(i.group(1).strip()).split(" ")
-                    match_converted = [float(i.replace(" ", "")) for i in match]
-            if len(match_converted) == 4:
-                if match_converted[0] == 14:
-                    output["14"] = match_converted[1]
-                    output["14_net"] = match_converted[2]
-                    output["14_total"] = match_converted[3]
-                elif match_converted[0] == 25.5:
-                    output["24"] = match_converted[1]
-                    output["24_net"] = match_converted[2]
-                    output["24_total"] = match_converted[3]
-            elif len(match_converted) == 8:
-                if match_converted[0] == 14:
-                    output["14"] = match_converted[1]
-                    output["14_net"] = match_converted[2]
-                    output["14_total"] = match_converted[3]
-                    output["24"] = match_converted[5]
-                    output["24_net"] = match_converted[6]
-                    output["24_total"] = match_converted[7]
-                elif match_converted[0] == 25.5:
-                    output["14"] = match_converted[5]
-                    output["14_net"] = match_converted[6]
-                    output["14_total"] = match_converted[7]
-                    output["24"] = match_converted[1]
-                    output["24_net"] = match_converted[2]
-                    output["24_total"] = match_converted[3]
-        elif vendor == "1367729":  #  "METOS OY AB"
-            for i in matches:
-                if i.group(1):
-                    if output["location"] == "L44":
-                        output["location"] = "L310"
-
-                    output["24_net"] = float(
-                        str(i.group(1).strip()).replace(",", ".").replace(" ", "")
-                    )
-                    output["24"] = float(
-                        str(i.group(2).strip()).replace(",", ".").replace(" ", "")
-                    )
-                    output["24_total"] = float(
-                        str(i.group(3).strip()).replace(",", ".").replace(" ", "")
-                    )
-        elif vendor == "1578999":  # "Oy Golden Crop AB"
-            for i in matches:
-                if i.group(1):
-                    if output["location"] == "L102":
-                        output["location"] = "L526"
-                    total_str = str(i.group(1).strip())
-                    reduced_str = re.sub(r"[^-0-9., ]", "", total_str).split(" ")
-                    value_list = []
-                    for j in reduced_str:
-                        if j != "":
-                            value_list.append(float(j.replace(",", "").strip()))
-
-                    if len(value_list) == 3:
-                        if value_list[0] == 14:
-                            output["14"] = value_list[2]
-                            output["14_net"] = value_list[1]
-                            output["14_total"] = round(value_list[2] + value_list[1], 2)
-                        elif value_list[0] == 25.5:
-                            output["24"] = value_list[2]
-                            output["24_net"] = value_list[1]
-                            output["24_total"] = round(value_list[2] + value_list[1], 2)
-                    elif len(value_list) == 6:
-                        if value_list[0] == 14:
-                            output["14"] = value_list[2]
-                            output["14_net"] = value_list[1]
-                            output["14_total"] = round(value_list[2] + value_list[1], 2)
-                            output["24"] = value_list[5]
-                            output["24_net"] = value_list[4]
-                            output["24_total"] = round(value_list[5] + value_list[4], 2)
-                        elif value_list[0] == 25.5:
-                            output["14"] = value_list[5]
-                            output["14_net"] = value_list[4]
-                            output["14_total"] = round(value_list[5] + value_list[4], 2)
-                            output["24"] = value_list[2]
-                            output["24_net"] = value_list[1]
-                            output["24_total"] = round(value_list[2] + value_list[1], 2)
-
-        elif vendor == "1426362":  #  "Kalaneuvos Oy"
-            for i in matches:
-                if i.group(1):
-                    total_str = str(i.group(1).strip()).split(" alv 14,00% summa eur ")
-                    print(total_str)
-                    reduced_list = [
-                        float(
-                            re.sub(r"[^-0-9., ]", "", j)
-                            .replace(".", "")
-                            .replace(",", ".")
-                            .strip()
-                        )
-                        for j in total_str
-                    ]
-                    output["14"] = reduced_list[1]
-                    output["14_net"] = reduced_list[0]
-                    output["14_total"] = round(reduced_list[0] + reduced_list[1], 2)
-        elif (
-            vendor == "1389643" or vendor == "1394052"
-        ):  # "FINNISH FRESHFISH OY", "HÄTÄLÄ OY F56451"
-            for i in matches:
-                if i.group(1):
-                    total_str = str(i.group(1).strip()).split("14,00 %")
-                    reduced_list = [
-                        float(
-                            re.sub(r"[^-0-9., ]", "", j)
-                            .replace(".", "")
-                            .replace(",", ".")
-                            .strip()
-                        )
-                        for j in total_str
-                    ]
-
-                    output["14"] = reduced_list[1]
-                    output["14_net"] = reduced_list[0]
-                    output["14_total"] = round(reduced_list[0] + reduced_list[1], 2)
-        elif (
-            vendor == "1276917" or vendor == "1375629"
-        ):  # "KANTA-HÄMEEN TUORETUOTE OY", "Tukkutalo Heinonen Oy"
-            for i in matches:
-                total_str = str(i.group(1).strip()).replace(",", ".").split(" ")
-
-                new_list = []
-                for item in total_str:
-                    try:
-                        new_list.append(float(item))
-                    except ValueError:
-                        pass  # skip items that cannot be converted to float
-
-                if (
-                    "14.00%" in total_str
-                    and "25.50%" in total_str
-                    and len(new_list) == 4
-                ):
-                    output["14"] = new_list[1]
-                    output["14_net"] = new_list[0]
-                    output["14_total"] = new_list[0] + new_list[1]
-                    output["24"] = new_list[3]
-                    output["24_net"] = new_list[2]
-                    output["24_total"] = new_list[2] + new_list[3]
-                elif "14.00%" in total_str and len(new_list) == 2:
-                    output["14"] = new_list[1]
-                    output["14_net"] = new_list[0]
-                    output["14_total"] = new_list[0] + new_list[1]
-                elif "25.50%" in total_str and len(new_list) == 2:
-                    output["24"] = new_list[1]
-                    output["24_net"] = new_list[0]
-                    output["24_total"] = new_list[0] + new_list[1]
-        elif vendor == "1714901":  # "AGRICA AB"
-            for i in matches:
-                total_str = i.group(1).strip().split(" ")
-                print(total_str)
-
-                total_str = [float(j) for j in total_str]
-                print(total_str)
-                if len(total_str) == 11:
-                    output["14_net"] = total_str[1]
-                    output["14"] = total_str[2]
-                    output["14_total"] = total_str[3]
-                    output["24_net"] = total_str[5]
-                    output["24"] = total_str[6]
-                    output["24_total"] = total_str[7]
-
-                if len(total_str) == 7 and total_str[0] == 14:
-                    output["14_net"] = total_str[1]
-                    output["14"] = total_str[2]
-                    output["14_total"] = total_str[3]
-                    output["24_net"] = 0
-                    output["24"] = 0
-                    output["24_total"] = 0
-
-                if len(total_str) == 7 and total_str[0] == 25.5:
-                    output["14_net"] = 0
-                    output["14"] = 0
-                    output["14_total"] = 0
-                    output["24_net"] = total_str[1]
-                    output["24"] = total_str[2]
-                    output["24_total"] = total_str[3]
-
-        elif vendor == "2000009":  # "Fisu Pojat Oy"
-            for i in matches:
-                total_str = [*i.group(1).strip().replace(" ", "").replace(",", ".")]
-                for c in range(len(total_str)):
-                    if total_str[c] == ".":
-                        total_str.insert(c + 3, " ")
-
-                total_str_list = "".join(total_str).strip().split(" ")
-                total_str_list = [float(i) for i in total_str_list]
-
-                if (
-                    len(total_str_list) == 3
-                    and total_str_list[2] == total_str_list[1] + total_str_list[0]
-                ):
-                    output["14_net"] = total_str_list[0]
-                    output["14"] = total_str_list[1]
-                    output["14_total"] = total_str_list[2]
-        elif vendor == "1553180":  # "Oy Hartwall Ab"
-            for i in matches:
-                total_str = i.group(1).strip().replace(" %", "%")
-                total_str = total_str.replace(",", ".").split(" ")
-                if "14%" in total_str and "24%" in total_str:
-                    output["14_net"] = float(total_str[1])
-                    output["14"] = float(total_str[2])
-                    output["14_total"] = float(total_str[3])
-                    output["24_net"] = float(total_str[5])
-                    output["24"] = float(total_str[6])
-                    output["24_total"] = float(total_str[7])
-                elif "14%" in total_str:
-                    output["14_net"] = float(total_str[1])
-                    output["14"] = float(total_str[2])
-                    output["14_total"] = float(total_str[3])
-                elif "24%" in total_str:
-                    output["24_net"] = float(total_str[1])
-                    output["24"] = float(total_str[2])
-                    output["24_total"] = float(total_str[3])
-
-        elif vendor == "1433275":  # "Kesko Oyj"
-            if output["location"] == "L102":
-                output["location"] = "L526"
-            for i in matches:
-                total_str = i.group(1).strip().replace(",", ".").split(" ")
-                total_str = [float(i) for i in total_str]
-                if len(total_str) == 4:
-                    if total_str[1] == 14:
-                        output["14_net"] = total_str[0]
-                        output["14"] = total_str[2]
-                        output["14_total"] = total_str[3]
-                    elif total_str[1] == 25.5:
-                        output["24_net"] = total_str[0]
-                        output["24"] = total_str[2]
-                        output["24_total"] = total_str[3]
-                elif len(total_str) == 8:
-                    pass
-                    output["24_net"] = total_str[0]
-                    output["24"] = total_str[2]
-                    output["24_total"] = total_str[3]
-                    output["14_net"] = total_str[4]
-                    output["14"] = total_str[6]
-                    output["14_total"] = total_str[7]
-
-        elif vendor == "1301716":  # "AB Tingstad Papper"
-            pass
-        elif vendor == "1566645":  # "Yellow Service Oy Grönroos"
-            for i in matches:
-                total_str = i.group(1).strip().replace(",", ".").split(" ")
-                total_str = [float(i) for i in total_str]
-                output["24_net"] = total_str[1]
-                output["24"] = total_str[2]
-                output["24_total"] = total_str[3]
-        elif vendor == "2000224":  # "FinBlu Safety Oy"
-            for i in matches:
-                total_str = i.group(1).replace(",", ".").split("arvonlisävero")
-                total_str = [i.strip() for i in total_str if i != "" and i != " "]
-                for i in total_str:
-                    if "0 % " in i:
-                        output["0"] = float(i.replace("0 % ", ""))
-                    if "14 % " in i:
-                        output["14"] = float(i.replace("14 % ", ""))
-                    if "25.5 % " in i:
-                        output["24"] = float(i.replace("25.5 % ", ""))
-                    if "a " in i:
-                        output["net"] = float(i.replace("a ", "").replace(" ", ""))
-                if "net" in output and "24" not in output:
-                    output["14_net"] = output["net"]
-                    output["14_total"] = round(output["14_net"] + output["14"], 2)
-
-                if "net" in output and "14" not in output:
-                    output["24_net"] = output["net"]
-                    output["24_total"] = round(output["24_net"] + output["24"], 2)
-
-                if "net" in output and "14" in output and "24" in output:
-                    output["24_net"] = round(output["24"] / 0.255, 2)
-                    output["14_net"] = round(output["net"] - output["24_net"], 2)
-                    output["14_total"] = round(output["14_net"] + output["14"], 2)
-                    output["24_total"] = round(output["24_net"] + output["24"], 2)
-
-        elif (
-            vendor == "1357805" or vendor == "2000219"
-        ):  # "SPARTAO OY", "Firewok Finland Oy"
-            for i in matches:
-                total_str = i.group(1).strip().replace(",", ".").split(" ")
-                for j in range(len(total_str)):
-                    if total_str[j] == "14%":
-                        output["14_net"] = float(total_str[j + 1])
-                        output["14"] = float(total_str[j + 3])
-                        output["14_total"] = output["14_net"] + output["14"]
-                        output["14_total"] = round(output["14_total"], 2)
-                    elif total_str[j] == "24%":
-                        output["24_net"] = float(total_str[j + 1])
-                        output["24"] = float(total_str[j + 3])
-                        output["24_total"] = output["24_net"] + output["24"]
-                        output["24_total"] = round(output["24_total"], 2)
+        parser.parse(text, output)
         myDict = {key: val for key, val in output.items() if val != 0}
     except:
         return "Check your input vendor information!"
     return myDict
 
 
+def extract_invoice(source, vendor, location_master_data=None):
+    """
+    Extract the posting information of an invoice PDF, using the extraction cache.
+
+    source: path of the PDF file or its content.
+    vendor: Basware vendor ID.
+    location_master_data: 'Location' master data DataFrame, loaded from SharePoint when not given.
+    output: the info_extractor output. The extracted text and the posting information are
+        cached by the SHA-256 of the PDF and the parser version, the latter only when the
+        master data version is known.
+    """
+    if not isinstance(source, (bytes, bytearray)):
+        with open(source, "rb") as f:
+            source = f.read()
+    digest = hashlib.sha256(source).hexdigest()
+    parser = get_parser(vendor)
+    location_index = get_location_index(location_master_data)
+
+    posting_key = None
+    if location_index.version is not None:
+        posting_key = (
+            f"posting:{digest}:{vendor}:{PARSER_VERSION}:{location_index.version}"
+        )
+        posting_info = extraction_cache.get(posting_key)
+        if posting_info is not None:
+            return posting_info
+
+    region = json.dumps(parser.region, sort_keys=True)
+    text_key = f"text:{digest}:{PARSER_VERSION}:{region}"
+    pages = extraction_cache.get(text_key)
+    if pages is None:
+        pages = extract_pdf_text(source, parser.region)
+        extraction_cache.put(text_key, pages)
+    # The region pages are not complete when they are cropped.
+    complete = dict(pages if (parser.region or {}).get("crop") is None else pages[:1])
+
+    def document_text():
+        pages_key = f"pages:{digest}:{PARSER_VERSION}:{region}"
+        other_pages = extraction_cache.get(pages_key)
+        if other_pages is None:
+            other_pages = extract_pdf_pages(source, complete)
+            extraction_cache.put(pages_key, other_pages)
+        texts = {**complete, **dict(other_pages)}
+        return "".join(texts[index] for index in sorted(texts))
+
+    posting_info = info_extractor(
+        text="".join(text for _, text in pages),
+        vendor=vendor,
+        location_master_data=location_master_data,
+        document_text=document_text,
+    )
+    if posting_key is not None and isinstance(posting_info, dict):
+        extraction_cache.put(posting_key, posting_info)
+    return posting_info
+
+
+ExtractionResult = namedtuple(
+    "ExtractionResult",
+    ["vendor", "invoice_num", "posting_info", "error", "seconds"],
+    defaults=(None,),
+)
+
+_worker_master_data = None
+
+
+def _init_extraction_worker(location_master_data, version):
+    """
+    Build the location index once per worker process.
+    The vendor expressions are compiled when the worker imports this module.
+    """
+    global _worker_master_data
+    _worker_master_data = location_master_data
+    get_location_index(location_master_data, version)
+
+
+def _extract_item(item):
+    vendor, invoice_num, source = item
+    start = time.perf_counter()
+    try:
+        posting_info = extract_invoice(
+            source, vendor, location_master_data=_worker_master_data
+        )
+        if not isinstance(posting_info, dict):
+            raise ValueError(posting_info)
+        posting_info["INV No."] = invoice_num
+        return ExtractionResult(
+            vendor, invoice_num, posting_info, None, time.perf_counter() - start
+        )
+    except Exception as e:
+        return ExtractionResult(
+            vendor,
+            invoice_num,
+            None,
+            f"{type(e).__name__}: {e}",
+            time.perf_counter() - start,
+        )
+
+
+def extract_batch(items, max_workers=None, location_master_data=None):
+    """
+    Extract the posting information of many invoice PDFs on all cores.
+
+    items: iterable of (vendor, invoice_num, pdf path or bytes), consumed as the
+        extractions complete: at most twice as many items as workers are in flight.
+    max_workers: number of worker processes, defaults to the number of CPUs.
+    location_master_data: 'Location' master data DataFrame, loaded from SharePoint when not given.
+    yields: ExtractionResult for every item, in completion order. Per-item failures are
+        reported in its 'error' field instead of being raised.
+    """
+    version = None
+    if location_master_data is None:
+        location_master_data, version = get_master_data()
+    max_workers = max_workers or os.cpu_count()
+    items = iter(items)
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_extraction_worker,
+        initargs=(location_master_data, version),
+    ) as executor:
+        futures = {}
+        while True:
+            for item in itertools.islice(items, 2 * max_workers - len(futures)):
+                futures[executor.submit(_extract_item, item)] = item
+            if not futures:
+                break
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                vendor, invoice_num, _ = futures.pop(future)
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield ExtractionResult(
+                        vendor, invoice_num, None, f"{type(e).__name__}: {e}"
+                    )
+
+
+class ExtractionPool:
+    """
+    Worker processes extracting the posting information of invoice PDFs while the
+    browsers carry on, kept for the whole run.
+
+    The pool starts on the first submit and its processes are spawned on demand. At most
+    max_pending PDFs are queued or extracted at a time, submit blocks when the queue is full.
+    """
+
+    def __init__(self, max_workers=None, max_pending=None):
+        """
+        Parameters:
+        - max_workers (int): Number of worker processes, defaults to EXTRACTION_WORKERS or
+          the number of CPUs.
+        - max_pending (int): Size of the queue, defaults to twice the number of workers.
+        """
+        self.max_workers = (
+            max_workers or int(os.getenv("EXTRACTION_WORKERS", 0)) or os.cpu_count()
+        )
+        self._pending = threading.BoundedSemaphore(max_pending or 2 * self.max_workers)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._executor is None:
+                location_master_data, version = get_master_data()
+                # Spawned, as forking the threads of the browser workers is not safe.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_extraction_worker,
+                    initargs=(location_master_data, version),
+                )
+            return self._executor
+
+    def submit(self, vendor, invoice_num, source):
+        """
+        Queue the extraction of an invoice PDF, waiting while the queue is full.
+
+        Returns:
+        - Future: Resolves to the ExtractionResult of the invoice.
+        """
+        executor = self._start()
+        self._pending.acquire()
+        try:
+            future = executor.submit(_extract_item, (vendor, invoice_num, source))
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def close(self):
+        """
+        Stop the worker processes after the queued extractions.
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
 if DEBUG:
 
     def read_pdf_text(path=TEMP_PATH, file_type="pdf"):
@@ -4,26 +4,42 @@ import os
 import logging
 import time
 import datetime as dt
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 from dotenv import load_dotenv
 
 from selenium.webdriver.support.ui import Select
-from drivers.webdriver import setup_driver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.alert import Alert
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
-from config.logger_config import setup_logging
-from extractor import info_extractor, expressions
-from utils.pdf_utils import read_pdf_text
-from utils.file_utils import reset_folder
-from utils.webdriver_utils import wait_for_element, iframe_context
-from services.authentication import bw_login
-from services.sharepoint import download_csv_data, upload_invoice_data
-
-setup_logging()
+from config.logger_config import setup_logging, str_to_bool
+from extractor import ExtractionPool, expressions
+from utils.pdf_utils import read_pdf_bytes
+from utils.timing_utils import step_timer
+from utils.webdriver_utils import (
+    wait_for_element,
+    iframe_context,
+    dismiss_optional_dialog,
+    log_probe_stats,
+)
+from services.posting import write_posting_rows, posting_row_save_button
+from services.master_data import get_master_data
+from services.sharepoint import download_csv_data
+from services.dry_run import DryRunReport
+from services.pipeline import pipeline_stats
+from services.run_state import RunState
+from services.status_journal import StatusJournal
+from services.worker_pool import BrowserLauncher, run_worker_pool
+
+# Both open nothing until they are used. The spawned extraction workers re-import this
+# script as '__mp_main__', so the logging and everything else run only from main().
+run_state = RunState()
+
+extraction_pool = ExtractionPool()
 
 
 def get_inv_number(df):
@@ -74,7 +90,11 @@ def filtering_invoice(
         ).select_by_visible_text(company)
         inv_num_input = wait_for_element(
             driver, (By.ID, "InvoiceNumberCtrl"), "clear invoice number and input"
-        ).send_keys(invoice_num)
+        )
+        if invoice_num:
+            inv_num_input.send_keys(invoice_num)
+        else:
+            inv_num_input.clear()
         supplier_input = wait_for_element(
             driver,
             (By.XPATH, "/html/body/div/form/div[3]/div[1]/div[2]/div/input"),
@@ -133,21 +153,149 @@ def try_click_invoice_button(
     return False
 
 
-def get_invoice_text(driver, vendor, invoice_num):
-    nav_to_purchase_invoice(driver)
-    try_click_invoice_button(driver, vendor, invoice_num)
+RESULT_TABLE_XPATH = "/html/body/div/form/div[4]/table/tbody"
+
+# Column of the invoice number, the link to the invoice, in the result table by filter status.
+RESULT_LINK_COLUMNS = {"All": 11, "Data Incomplete": 12}
+
+_RESULT_TABLE_SCRIPT = """
+function find(xpath) {
+    return document.evaluate(xpath, document, null, 9, null).singleNodeValue;
+}
+function selected(select) {
+    if (!select || select.selectedIndex < 0) return null;
+    return select.options[select.selectedIndex].text.trim();
+}
+var invoiceNumber = document.getElementById("InvoiceNumberCtrl");
+var supplier = find(arguments[2]);
+var table = find(arguments[3]);
+var result = {
+    company: selected(find(arguments[0])),
+    status: selected(find(arguments[1])),
+    supplier: supplier ? supplier.value.trim() : null,
+    invoice_num: invoiceNumber ? invoiceNumber.value.trim() : null,
+    fresh: !!table && !table.resultTableRead,
+    rows: []
+};
+if (table) {
+    table.resultTableRead = true;
+    for (var i = 1; i < table.rows.length; i++) {
+        result.rows.push(Array.prototype.map.call(table.rows[i].cells, function (cell) {
+            return cell.textContent.trim();
+        }));
+    }
+}
+return result;
+"""
+
+
+def read_result_table(driver, wait_for_update=False, timeout=10, poll_interval=0.2):
+    """
+    Read the filter and all rows of the process purchase invoices result table in one call.
 
-    try:
-        with iframe_context(driver, "error_iframe"):
-            override_lock_status_button = wait_for_element(
-                driver,
-                (By.XPATH, "/html/body/div/div[4]/input[1]"),
-                "try to override the lock frame and click",
-                silent=True,
-            ).click()
-    except:
-        pass
+    Parameters:
+    - driver: Selenium WebDriver instance, switched to the main iframe.
+    - wait_for_update (bool): Wait until the table was replaced since it was last read,
+      after the filter was updated.
+
+    Returns:
+    - dict: 'company', 'status', 'supplier' and 'invoice_num' of the filter, and 'rows',
+      the cell texts of every row below the header.
+
+    Raises:
+    - TimeoutException: if the table was not replaced within the timeout when waiting
+      for the update, the filter fields may then show a filter the rows do not match.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        table = driver.execute_script(
+            _RESULT_TABLE_SCRIPT,
+            "/html/body/div/form/div[3]/div[1]/select",
+            "/html/body/div[1]/form/div[3]/div[5]/select",
+            "/html/body/div/form/div[3]/div[1]/div[2]/div/input",
+            RESULT_TABLE_XPATH,
+        )
+        if not wait_for_update or table["fresh"]:
+            return table
+        if time.monotonic() >= deadline:
+            raise TimeoutException(
+                f"The result table was not updated within {timeout} seconds."
+            )
+        time.sleep(poll_interval)
+
+
+def invoice_links(table, vendor, company="Spartao"):
+    """
+    Map the invoice numbers of a result table filtered for the vendor to the XPaths of
+    their links. Returns an empty map when the table is filtered for anything else.
+    An invoice number listed in several rows is left out, so it is opened by filtering
+    for the invoice number instead.
+    """
+    column = RESULT_LINK_COLUMNS.get(table["status"])
+    if (
+        column is None
+        or table["company"] != company
+        or table["supplier"] != expressions[vendor][0]
+        or table["invoice_num"]
+    ):
+        return {}
+    links = {}
+    duplicates = set()
+    for row, cells in enumerate(table["rows"], 2):
+        if len(cells) < column or not cells[column - 1]:
+            continue
+        invoice_num = cells[column - 1]
+        if invoice_num in links:
+            duplicates.add(invoice_num)
+        links[invoice_num] = f"{RESULT_TABLE_XPATH}/tr[{row}]/td[{column}]/a"
+    for invoice_num in duplicates:
+        del links[invoice_num]
+    return links
+
+
+def open_invoice(driver, vendor, invoice_num, statuses=["Data Incomplete", "All"]):
+    """
+    Open the invoice from the result table filtered for its vendor.
 
+    The result table is read as it is shown, and only filtered again for the vendor, once
+    per status, when it does not list the invoice. The filter is kept while the following
+    invoices of the vendor are opened, so they need no filter update. Falls back to filtering
+    by the invoice number, e.g. when the invoice is not on the first page of the table.
+    """
+    invoice_num = str(invoice_num)
+    with iframe_context(driver, "main_iframe"):
+        link = invoice_links(read_result_table(driver), vendor).get(invoice_num)
+    for status in statuses:
+        if link is not None:
+            break
+        filtering_invoice(driver, supplier=vendor, status=status, invoice_num="")
+        with iframe_context(driver, "main_iframe"):
+            try:
+                table = read_result_table(driver, wait_for_update=True)
+            except TimeoutException as e:
+                logging.warning(f"{e} Status '{status}' is skipped.")
+                continue
+            link = invoice_links(table, vendor).get(invoice_num)
+        logging.info(
+            f"Filtered {len(table['rows'])} invoices of vendor {vendor} with status '{status}'."
+        )
+
+    if link is None:
+        return try_click_invoice_button(driver, vendor, invoice_num, statuses)
+    with iframe_context(driver, "main_iframe"):
+        wait_for_element(
+            driver, (By.XPATH, link), "open the invoice from the result table"
+        ).click()
+    return True
+
+
+def download_invoice_pdf(driver, download_path):
+    """
+    Download the PDF of the opened invoice.
+
+    Returns:
+    - bytes: The content of the PDF.
+    """
     logging.info("Step: downloading the pdf.")
     with iframe_context(driver, "viewer_iframe"):
         try:
@@ -162,12 +310,13 @@ def get_invoice_text(driver, vendor, invoice_num):
             logging.debug(
                 "Save PDF button not found or not clickable, but continuing since the file downloads successfully."
             )
-        time.sleep(2)
-        logging.info("Step: extacting the posting value.")
-        text = read_pdf_text(file_type="pdf")
-        posting_info = info_extractor(text=text, vendor=vendor)
-        posting_info["INV No."] = invoice_num
+        return read_pdf_bytes(download_path, file_type="pdf")
+
 
+def prepare_invoice(driver, vendor, invoice_num):
+    """
+    Fill the fields of the opened invoice that do not depend on its PDF.
+    """
     with iframe_context(driver, "info_iframe"):
         organizational_unit_btn = wait_for_element(
             driver,
@@ -207,23 +356,13 @@ def get_invoice_text(driver, vendor, invoice_num):
                 "find the ref number and clear the field",
             ).send_keys(invoice_num)
 
-    try:
-        with iframe_context(driver, "error_iframe"):
-            next_time_check = wait_for_element(
-                driver,
-                (By.XPATH, "/html/body/div/div[3]/span/label"),
-                "find the show next time check and click",
-                silent=True,
-            ).click()
-            next_ok_btn = wait_for_element(
-                driver,
-                (By.XPATH, '//*[@id="yesbutton"]'),
-                "find the don't show next time check and click",
-                silent=True,
-            ).click()
-    except:
-        pass
+    dismiss_optional_dialog(driver, "dont_show_next_time")
 
+
+def post_invoice(driver, vendor, invoice_num, posting_info):
+    """
+    Set the approver and the posting rows of the prepared invoice, then post and save it.
+    """
     if "approver" in posting_info.keys():
         with iframe_context(driver, "info_iframe"):
             if "approver" in posting_info:
@@ -287,22 +426,7 @@ def get_invoice_text(driver, vendor, invoice_num):
             "find the post button and click",
         ).click()
 
-    try:
-        with iframe_context(driver, "error_iframe"):
-            next_time_check = wait_for_element(
-                driver,
-                (By.XPATH, "/html/body/div/div[3]/span/label"),
-                "find the show next time check and click",
-                silent=True,
-            ).click()
-            next_ok_btn = wait_for_element(
-                driver,
-                (By.XPATH, '//*[@id="yesbutton"]'),
-                "find the don't show next time check and click",
-                silent=True,
-            ).click()
-    except:
-        pass
+    dismiss_optional_dialog(driver, "dont_show_next_time")
 
     try:
         with iframe_context(driver, "action_iframe"):
@@ -314,269 +438,15 @@ def get_invoice_text(driver, vendor, invoice_num):
         logging.info(f"Posting values are empty, no need to delete posting.")
         pass
     if vendor != "1301716":
-        with iframe_context(driver, "posting_iframe"):
-            posting_sum = Select(
-                wait_for_element(
-                    driver,
-                    (By.ID, "PostingControl1_VATHandlingCtrl"),
-                    "find the posting sum",
-                )
-            )
-            if "location" in posting_info:
-                if posting_info["location"] == "L526":
-                    posting_info["department"] = "D4"
-                if posting_info["location"] == "L102":
-                    posting_info["department"] = "D4"
-                elif posting_info["location"] == "L101":
-                    posting_info["department"] = "D208"
-                    posting_info["class_code"] = "C7"
-                elif posting_info["location"] == "L76":
-                    posting_info["department"] = "D208"
-                elif posting_info["location"] == "L67" or posting_info["location"] == "L72" or posting_info["location"] == "L531":
-                    posting_info["department"] = "D208"
-                    posting_info["class_code"] = "C9"
-                elif posting_info["location"] == "L73":
-                    posting_info["department"] = "D208"
-                    posting_info["class_code"] = "C1"
-
-                    if "department" in posting_info:
-                        department = wait_for_element(
-                            driver,
-                            (
-                                By.XPATH,
-                                "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[2]/div/div/input",
-                            ),
-                            "update department",
-                        ).send_keys(posting_info["department"])
-
-                    if "class_code" in posting_info:
-                        class_code = wait_for_element(
-                            driver,
-                            (
-                                By.XPATH,
-                                "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[4]/div/div/input",
-                            ),
-                            "update class",
-                        ).send_keys(posting_info["class_code"])
-                    location = wait_for_element(
-                        driver,
-                        (
-                            By.XPATH,
-                            "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[3]/div/div/input",
-                        ),
-                        "update location",
-                    ).send_keys(posting_info["location"])
-
-                if "14" in posting_info:
-                    logging.info("Updating 14% row.")
-                    if "department" in posting_info:
-                        department = wait_for_element(
-                            driver,
-                            (
-                                By.XPATH,
-                                "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[2]/div/div/input",
-                            ),
-                            "updating 14% department",
-                        ).send_keys(posting_info["department"])
-                    if "class_code" in posting_info:
-                        class_code = wait_for_element(
-                            driver,
-                            (
-                                By.XPATH,
-                                "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[4]/div/div/input",
-                            ),
-                            "updating 14% class",
-                        ).send_keys(posting_info["class_code"])
-                    location = wait_for_element(
-                        driver,
-                        (
-                            By.XPATH,
-                            "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[3]/div/div/input",
-                        ),
-                        "updating 14% location",
-                    ).send_keys(posting_info["location"])
-                    logging.info("Change to Tax included.")
-                    posting_sum.select_by_visible_text("Tax included")
-                    if posting_info["14_total"] >= 0:
-                        debit = wait_for_element(
-                            driver,
-                            (
-                                By.XPATH,
-                                "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[7]/input",
-                            ),
-                            "updating 14% debit amount",
-                        ).send_keys(str(posting_info["14_total"]).replace(".", ","))
-                    elif posting_info["14_total"] < 0:
-                        credit = wait_for_element(
-                            driver,
-                            (
-                                By.XPATH,
-                                "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[8]/input",
-                            ),
-                            "updating 14% credit amount",
-                        ).send_keys(str(-posting_info["14_total"]).replace(".", ","))
-                    tax_code = wait_for_element(
-                        driver,
-                        (
-                            By.XPATH,
-                            "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[5]/div/div/input",
-                        ),
-                        "updating 14% tax code",
-                    ).send_keys("8")
-                    save_btn = wait_for_element(
-                        driver,
-                        (
-                            By.XPATH,
-                            "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[9]/a[1]",
-                        ),
-                        "find the save button and click",
-                    ).click()
-
-                    if "24" in posting_info:
-                        if "department" in posting_info:
-                            department = wait_for_element(
-                                driver,
-                                (
-                                    By.XPATH,
-                                    "/html/body/form/div[3]/div/div[3]/table/tbody/tr[3]/td[2]/div/div/input",
-                                ),
-                                "updating 24% department",
-                            ).send_keys(posting_info["department"])
-                        if "class_code" in posting_info:
-                            class_code = wait_for_element(
-                                driver,
-                                (
-                                    By.XPATH,
-                                    "/html/body/form/div[3]/div/div[3]/table/tbody/tr[3]/td[4]/div/div/input",
-                                ),
-                                "updating 24% class",
-                            ).send_keys(posting_info["class_code"])
-                        location = wait_for_element(
-                            driver,
-                            (
-                                By.XPATH,
-                                "/html/body/form/div[3]/div/div[3]/table/tbody/tr[3]/td[3]/div/div/input",
-                            ),
-                            "updating 24% location",
-                        ).send_keys(posting_info["location"])
-                        if posting_info["24_total"] >= 0:
-                            debit = wait_for_element(
-                                driver,
-                                (
-                                    By.XPATH,
-                                    "/html/body/form/div[3]/div/div[3]/table/tbody/tr[3]/td[7]/input",
-                                ),
-                                "updating 24% debit amount",
-                            ).send_keys(str(posting_info["24_total"]).replace(".", ","))
-                        elif posting_info["24_total"] < 0:
-                            credit = wait_for_element(
-                                driver,
-                                (
-                                    By.XPATH,
-                                    "/html/body/form/div[3]/div/div[3]/table/tbody/tr[3]/td[8]/input",
-                                ),
-                                "updating 24% credit amount",
-                            ).send_keys(
-                                str(-posting_info["24_total"]).replace(".", ",")
-                            )
-                        tax_code = wait_for_element(
-                            driver,
-                            (
-                                By.XPATH,
-                                "/html/body/form/div[3]/div/div[3]/table/tbody/tr[3]/td[5]/div/div/input",
-                            ),
-                            "updating 24% tax code",
-                        ).send_keys("6")
-                        save_btn = wait_for_element(
-                            driver,
-                            (
-                                By.XPATH,
-                                "/html/body/form/div[3]/div/div[3]/table/tbody/tr[3]/td[9]/a[1]",
-                            ),
-                            "find the save button and click",
-                        ).click()
-
-                if "24" in posting_info and "14" not in posting_info:
-                    if "department" in posting_info:
-                        department = wait_for_element(
-                            driver,
-                            (
-                                By.XPATH,
-                                "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[2]/div/div/input",
-                            ),
-                            "updating 24% department only",
-                        ).send_keys(posting_info["department"])
-                    if "class_code" in posting_info:
-                        class_code = wait_for_element(
-                            driver,
-                            (
-                                By.XPATH,
-                                "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[4]/div/div/input",
-                            ),
-                            "updating 24% class only",
-                        ).send_keys(posting_info["class_code"])
-                    location = wait_for_element(
-                        driver,
-                        (
-                            By.XPATH,
-                            "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[3]/div/div/input",
-                        ),
-                        "updating 24% class only",
-                    ).send_keys(posting_info["location"])
-                    posting_sum.select_by_visible_text("Tax included")
-
-                    if posting_info["24_total"] >= 0:
-                        debit = wait_for_element(
-                            driver,
-                            (
-                                By.XPATH,
-                                "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[7]/input",
-                            ),
-                            "updating 24% debit amount only",
-                        ).send_keys(str(posting_info["24_total"]).replace(".", ","))
-                    elif posting_info["24_total"] < 0:
-                        credit = wait_for_element(
-                            driver,
-                            (
-                                By.XPATH,
-                                "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[8]/input",
-                            ),
-                            "updating 24% credit amount only",
-                        ).send_keys(str(-posting_info["24_total"]).replace(".", ","))
-                    tax_code = wait_for_element(
-                        driver,
-                        (
-                            By.XPATH,
-                            "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[5]/div/div/input",
-                        ),
-                        "updating 24% tax code only",
-                    ).send_keys("6")
+        write_posting_rows(driver, posting_info)
 
-    try:
-        with iframe_context(driver, "error_iframe"):
-            next_time_check = wait_for_element(
-                driver,
-                (By.XPATH, "/html/body/div/div[3]/span/label"),
-                "find the show next time check and click",
-                silent=True,
-            ).click()
-            next_ok_btn = wait_for_element(
-                driver,
-                (By.XPATH, '//*[@id="yesbutton"]'),
-                "find the don't show next time check and click",
-                silent=True,
-            ).click()
-    except:
-        pass
+    dismiss_optional_dialog(driver, "dont_show_next_time")
 
-    if vendor == "1301716" or vendor == "1367729":
+    if vendor == "1301716":
         with iframe_context(driver, "posting_iframe"):
             save_btn = wait_for_element(
                 driver,
-                (
-                    By.XPATH,
-                    "/html/body/form/div[3]/div/div[3]/table/tbody/tr[2]/td[9]/a[1]",
-                ),
+                posting_row_save_button(2),
                 "find the save button and click",
             ).click()
     with iframe_context(driver, "action_iframe"):
@@ -585,29 +455,9 @@ def get_invoice_text(driver, vendor, invoice_num):
             (By.XPATH, "/html/body/form/div[3]/input[1]"),
             "find the OK button and click",
         ).click()
+    run_state.record(vendor, invoice_num, "posted")
 
-    try:
-        with iframe_context(driver, "error_iframe"):
-            next_time_check = wait_for_element(
-                driver,
-                (By.XPATH, "/html/body/div/div[3]/span/label"),
-                "find the show next time check and click",
-                silent=True,
-            ).click()
-            next_ok_btn = wait_for_element(
-                driver,
-                (By.XPATH, '//*[@id="yesbutton"]'),
-                "find the don't show next time check and click",
-                silent=True,
-            ).click()
-            next_ok_btn_ = wait_for_element(
-                driver,
-                (By.XPATH, "/html/body/div/div[5]/input"),
-                "find the don't show next time check and click",
-                silent=True,
-            ).click()
-    except:
-        pass
+    dismiss_optional_dialog(driver, "dont_show_next_time_confirm")
 
     with iframe_context(driver, "info_iframe"):
         save_inv_btn = wait_for_element(
@@ -615,63 +465,159 @@ def get_invoice_text(driver, vendor, invoice_num):
             (By.XPATH, "/html/body/form/div[3]/div[2]/input[1]"),
             "find the save invoice button and click",
         ).click()
+    run_state.record(vendor, invoice_num, "saved")
     return True
 
 
-def main():
-    load_dotenv()
-    bot_input = download_csv_data()
-    bot_input = bot_input[bot_input["status"] != "Success"]
-    operational_data = get_inv_number(bot_input)
-    filtered_df = operational_data[operational_data["status"].isin([np.nan, "Failed"])]
+def open_pending_invoice(driver, vendor, invoice_num):
+    """
+    Open the invoice from the process purchase invoices list, overriding its lock.
+    """
+    nav_to_purchase_invoice(driver)
+    open_invoice(driver, vendor, invoice_num)
+    dismiss_optional_dialog(driver, "lock_override")
 
-    driver = setup_driver(
-        download_path=os.path.join(os.getcwd(), os.getenv("TEMP_DIRECTORY", "temp"))
-    )
 
-    driver.switch_to.default_content()
-    if bw_login(
-        driver,
-        username=os.getenv("BW_USR"),
-        password=os.getenv("BW_PSW"),
-        login_url=os.getenv("BW_URL"),
-    ):
+def get_invoice_text(
+    driver,
+    vendor,
+    invoice_num,
+    download_path=os.path.join(os.getcwd(), os.getenv("TEMP_DIRECTORY", "temp")),
+):
+    """
+    Process an invoice in pipeline stages: the invoice is opened and its PDF downloaded
+    in the browser, then the PDF is extracted in an extraction process while the other
+    browsers carry on. The invoice is prepared and posted only when the extraction
+    succeeded and matched a location, so a failed extraction leaves it unedited.
+    """
+    if run_state.reached(vendor, invoice_num, "saved"):
+        logging.info(f"Invoice {invoice_num} was already saved by an earlier run.")
+        return True
+    if run_state.reached(vendor, invoice_num, "posted"):
+        raise RuntimeError(
+            f"Invoice {invoice_num} was posted but not saved by an earlier run, check it in Basware."
+        )
+    extraction = None
+    with pipeline_stats.measure("fetch"):
+        open_pending_invoice(driver, vendor, invoice_num)
+        run_state.record(vendor, invoice_num, "opened")
+
+        posting_info = run_state.posting_info(vendor, invoice_num)
+        if posting_info is not None:
+            logging.info("Step: using the posting value extracted by an earlier run.")
+        else:
+            pdf_content = download_invoice_pdf(driver, download_path)
+    if posting_info is None:
+        logging.info("Step: extacting the posting value.")
+        with pipeline_stats.measure("extract_queue"):
+            extraction = extraction_pool.submit(vendor, invoice_num, pdf_content)
+
+    if extraction is not None:
+        with pipeline_stats.measure("extract_wait"):
+            result = extraction.result()
+        pipeline_stats.add("extract", result.seconds)
+        if result.error is not None:
+            raise ValueError(f"Extraction failed: {result.error}")
+        posting_info = result.posting_info
+        run_state.record(vendor, invoice_num, "pdf_extracted", posting_info)
+    # The invoice is only edited once its posting rows can be written.
+    if vendor != "1301716" and "location" not in posting_info:
+        raise ValueError("Extraction failed: the location was not matched.")
+
+    with pipeline_stats.measure("prepare"):
+        prepare_invoice(driver, vendor, invoice_num)
+
+    with pipeline_stats.measure("post"):
+        post_invoice(driver, vendor, invoice_num, posting_info)
+    return True
 
-        for index, row in filtered_df.iterrows():
-            try:
-                if row["status"] != "Success":
-                    logging.info(
-                        f'==================================== Processing invoice {row["invoice_num"]} from {row["vendor"]} ===================================='
-                    )
-                    reset_folder(
-                        os.path.join(os.getcwd(), os.getenv("TEMP_DIRECTORY", "temp"))
-                    )
-                    get_invoice_text(
-                        driver=driver,
-                        vendor=row["vendor"].split(" / ")[-1],
-                        invoice_num=row["invoice_num"],
-                    )
-                    filtered_df.at[index, "status"] = "Success"
-                    logging.info(
-                        f"Invoice {row['invoice_num']} from {row['vendor']} has been processed successfully!"
-                    )
 
-            except Exception as e:
-                timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
-                screenshot_path = os.path.join(
-                    os.getcwd(), f"screenshot_{timestamp}.png"
-                )
-                driver.save_screenshot(screenshot_path)
-                filtered_df.at[index, "status"] = "Failed"
-                logging.error(
-                    f"Invoice {row['invoice_num']} from {row['vendor']} failed! Error message: {e}"
-                )
-            finally:
-                try:
-                    filtered_df = filtered_df.drop(columns="vendor_id")
-                except Exception as e:
-                    pass
-                upload_invoice_data(filtered_df)
+def _record_extraction_time(future):
+    if future.exception() is None:
+        pipeline_stats.add("extract", future.result().seconds)
+
+
+def extract_invoice_text(
+    driver,
+    vendor,
+    invoice_num,
+    report,
+    download_path=os.path.join(os.getcwd(), os.getenv("TEMP_DIRECTORY", "temp")),
+):
+    """
+    Dry run of get_invoice_text: open the invoice, download its PDF and queue its
+    extraction into the dry run report. The invoice fields are not touched, the invoice
+    is neither posted nor saved and nothing is recorded in the run state. The browser
+    goes on to the next invoice while the PDF is extracted.
+
+    Parameters:
+    - report (DryRunReport): The report the posting information is written to.
+    """
+    with pipeline_stats.measure("fetch"):
+        open_pending_invoice(driver, vendor, invoice_num)
+        pdf_content = download_invoice_pdf(driver, download_path)
+    logging.info("Step: extacting the posting value.")
+    with pipeline_stats.measure("extract_queue"):
+        extraction = extraction_pool.submit(vendor, invoice_num, pdf_content)
+    extraction.add_done_callback(_record_extraction_time)
+    report.track(vendor, invoice_num, extraction)
+    return True
+
+
+def main():
+    load_dotenv()
+    setup_logging()
+    dry_run = str_to_bool(os.getenv("DRY_RUN", "False"))
+    # The first browser launches and logs in while the bot input and the master data load,
+    # it is closed again when there is nothing to process.
+    launcher = BrowserLauncher()
+    launcher.launch(1)
+    master_data_loader = ThreadPoolExecutor(max_workers=1)
+    master_data = master_data_loader.submit(get_master_data)
+    master_data_loader.shutdown(wait=False)
+    try:
+        bot_input = download_csv_data()
+        bot_input = bot_input[bot_input["status"] != "Success"]
+        operational_data = get_inv_number(bot_input)
+        # Statuses journaled by a previous run that did not get to upload them.
+        journal = StatusJournal()
+        journal.replay(operational_data)
+        # Invoices posted by an earlier run are not reopened.
+        run_state.resume(operational_data)
+        filtered_df = operational_data[
+            operational_data["status"].isin([np.nan, "Failed"])
+        ]
+
+        filtered_df = filtered_df.drop(columns="vendor_id")
+        if filtered_df.empty:
+            logging.info("No invoices to process.")
+            launcher.cancel()
+            return
+
+        # Loaded once before the workers start, instead of by the first invoice of each.
+        master_data.result()
+        if dry_run:
+            logging.info("Dry run: the invoices are extracted, not posted.")
+            report = DryRunReport()
+            run_worker_pool(
+                filtered_df,
+                partial(extract_invoice_text, report=report),
+                launcher=launcher,
+                writer=report,
+            )
+        else:
+            run_worker_pool(
+                filtered_df, get_invoice_text, journal=journal, launcher=launcher
+            )
+    except BaseException:
+        launcher.cancel()
+        raise
+    finally:
+        extraction_pool.close()
+        # Also written when the run fails, to show where it got stuck.
+        step_timer.write_report()
+    log_probe_stats()
+    pipeline_stats.log()
 
 
 if __name__ == "__main__":
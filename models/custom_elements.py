@@ -1,8 +1,18 @@
 from selenium.webdriver.remote.webelement import WebElement
 
+from utils.timing_utils import step_timer
+
 
 # Define a new class that extends WebElement
 class CustomWebElement(WebElement):
+    # Name of the step the element was found for, set by wait_for_element.
+    step_name = "not specified"
+
+    def click(self):
+        with step_timer.timed(self.step_name, "click"):
+            super().click()
+
     def send_keys(self, keys):
-        self.clear()  # Clear the text field before sending keys
-        super().send_keys(keys)  # Call the original send_keys method
+        with step_timer.timed(self.step_name, "send_keys"):
+            self.clear()  # Clear the text field before sending keys
+            super().send_keys(keys)  # Call the original send_keys method
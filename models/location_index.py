@@ -0,0 +1,109 @@
+class LocationIndex:
+    """
+    Prebuilt lookup structures for matching invoice text to Netsuite locations.
+
+    The index is built once per master data version and holds:
+    - a token trie of every comma-separated 'bw_matching' key, so single and
+      multi-word keys are matched in one pass over the invoice tokens;
+    - a dictionary of External ID -> Basware approver.
+    """
+
+    _END = object()
+
+    def __init__(self, keys, approvers, version=None):
+        """
+        Parameters:
+        - keys: iterable of (matching key, External ID) pairs.
+        - approvers: mapping of External ID -> Basware approver name.
+        - version: optional identifier of the master data the index was built from.
+        """
+        self._trie = {}
+        self._approvers = dict(approvers)
+        self.version = version
+        for key, external_id in keys:
+            tokens = tuple(key.split())
+            if not tokens:
+                continue
+            node = self._trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            # A key listed again overrides the earlier one, as it did with the dictionary.
+            node[self._END] = external_id
+
+    @classmethod
+    def from_dataframe(cls, master_location, approver_overrides=None, version=None):
+        """
+        Build the index from the 'Location' sheet of the master data.
+
+        Parameters:
+        - master_location: DataFrame with 'bw_matching', 'External ID' and 'bw_approver' columns.
+        - approver_overrides: optional mapping of External ID -> approver applied on top of the sheet.
+        - version: optional identifier of the master data the index was built from.
+        """
+        keys = []
+        # Built through the same dictionary as before, so a duplicated 'bw_matching' value
+        # resolves to the External ID of its last row, in the order it was first listed.
+        for matching, external_id in dict(
+            zip(master_location["bw_matching"], master_location["External ID"])
+        ).items():
+            if isinstance(matching, str):
+                keys.extend((key.strip(), external_id) for key in matching.split(","))
+
+        approvers = dict(
+            zip(master_location["External ID"], master_location["bw_approver"])
+        )
+        approvers.update(approver_overrides or {})
+        return cls(keys, approvers, version=version)
+
+    def find_all(self, tokens):
+        """
+        Return every (position, key, External ID) match in the token sequence.
+
+        At each position only the longest key is reported, so 'espoonkeskus itä'
+        wins over 'espoonkeskus' when both are configured.
+        """
+        tokens = list(tokens)
+        matches = []
+        for start in range(len(tokens)):
+            node = self._trie
+            longest = None
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                if self._END in node:
+                    longest = (
+                        start,
+                        " ".join(tokens[start : end + 1]),
+                        node[self._END],
+                    )
+            if longest is not None:
+                matches.append(longest)
+        return matches
+
+    def match(self, tokens):
+        """
+        Return the External ID of the leftmost, longest key found in the tokens, or None.
+        """
+        node_root = self._trie
+        tokens = list(tokens)
+        for start in range(len(tokens)):
+            if tokens[start] not in node_root:
+                continue
+            node = node_root
+            found = None
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                if self._END in node:
+                    found = node[self._END]
+            if found is not None:
+                return found
+        return None
+
+    def approver(self, external_id):
+        """
+        Return the Basware approver of the location, raising KeyError when unknown.
+        """
+        return self._approvers[external_id]
@@ -0,0 +1,348 @@
+import re
+
+from config.re_pattern_config import get_expressions, get_regions
+
+PARSER_CLASSES = {}
+
+
+def register(*vendor_ids):
+    """
+    Class decorator registering a parser class for one or more Basware vendor IDs.
+    """
+
+    def decorator(cls):
+        for vendor_id in vendor_ids:
+            PARSER_CLASSES[vendor_id] = cls
+        return cls
+
+    return decorator
+
+
+def _set_rate(output, rate, net, vat, total):
+    output[f"{rate}_net"] = net
+    output[rate] = vat
+    output[f"{rate}_total"] = total
+
+
+class VendorParser:
+    """
+    Base class for the vendor-specific VAT summary parsers.
+
+    Each instance holds the compiled expression of one Basware vendor and fills
+    the '14'/'24' (net, VAT, total) keys of the posting output.
+    """
+
+    # Minimum number of capture groups the vendor expression must provide.
+    groups = 1
+    # Location External ID replacements applied to this vendor's invoices.
+    location_overrides = {}
+
+    def __init__(self, vendor_id, name, expression, approver, region=None):
+        self.vendor_id = vendor_id
+        self.name = name
+        self.approver = approver
+        # Part of the PDF the expression needs, see config.re_pattern_config.regions.
+        self.region = region
+        self.pattern = re.compile(expression)
+        if self.pattern.groups < self.groups:
+            raise ValueError(
+                f"Expression of vendor {vendor_id} ({name}) has {self.pattern.groups} "
+                f"groups, {type(self).__name__} needs {self.groups}."
+            )
+
+    def override_location(self, output):
+        location = output["location"]
+        output["location"] = self.location_overrides.get(location, location)
+
+    def parse(self, text, output):
+        for match in self.pattern.finditer(text):
+            self.parse_match(match, output)
+        return output
+
+    def parse_match(self, match, output):
+        raise NotImplementedError
+
+
+@register("1381774")
+class SBusinessParser(VendorParser):
+    """S-Business Oy: 'rate vat net total' groups, only the last match is used."""
+
+    def parse(self, text, output):
+        values = None
+        for match in self.pattern.finditer(text):
+            if match.group(1):
+                values = [float(i) for i in match.group(1).strip().split(" ")]
+        if values is None:
+            raise ValueError(f"No VAT summary found for vendor {self.vendor_id}.")
+
+        if len(values) == 4:
+            if values[0] == 14:
+                _set_rate(output, "14", values[2], values[1], values[3])
+            elif values[0] == 25.5:
+                _set_rate(output, "24", values[2], values[1], values[3])
+        elif len(values) == 8:
+            first, second = ("14", "24") if values[0] == 14 else ("24", "14")
+            if values[0] in (14, 25.5):
+                _set_rate(output, first, values[2], values[1], values[3])
+                _set_rate(output, second, values[6], values[5], values[7])
+        return output
+
+
+@register("1367729")
+class MetosParser(VendorParser):
+    """METOS OY AB: separate net, VAT and total groups for the 25.5% rate."""
+
+    groups = 3
+    location_overrides = {"L44": "L310"}
+
+    def parse_match(self, match, output):
+        if match.group(1):
+            self.override_location(output)
+            net, vat, total = (
+                float(match.group(i).strip().replace(",", ".").replace(" ", ""))
+                for i in (1, 2, 3)
+            )
+            _set_rate(output, "24", net, vat, total)
+
+
+@register("1578999")
+class GoldenCropParser(VendorParser):
+    """Oy Golden Crop AB: 'rate base vat' triplets with thousands separators."""
+
+    location_overrides = {"L102": "L526"}
+
+    def parse_match(self, match, output):
+        if not match.group(1):
+            return
+        self.override_location(output)
+        reduced = re.sub(r"[^-0-9., ]", "", match.group(1).strip()).split(" ")
+        values = [float(j.replace(",", "").strip()) for j in reduced if j != ""]
+
+        if len(values) not in (3, 6) or values[0] not in (14, 25.5):
+            return
+        rates = ("14", "24") if values[0] == 14 else ("24", "14")
+        for rate, offset in zip(rates, range(0, len(values), 3)):
+            net, vat = values[offset + 1], values[offset + 2]
+            _set_rate(output, rate, net, vat, round(vat + net, 2))
+
+
+class SplitAmountParser(VendorParser):
+    """Single 14% row where the net and VAT amounts are split on a fixed separator."""
+
+    separator = None
+
+    def parse_match(self, match, output):
+        if match.group(1):
+            parts = match.group(1).strip().split(self.separator)
+            values = [
+                float(
+                    re.sub(r"[^-0-9., ]", "", j)
+                    .replace(".", "")
+                    .replace(",", ".")
+                    .strip()
+                )
+                for j in parts
+            ]
+            net, vat = values[0], values[1]
+            _set_rate(output, "14", net, vat, round(net + vat, 2))
+
+
+@register("1426362")
+class KalaneuvosParser(SplitAmountParser):
+    """Kalaneuvos Oy."""
+
+    separator = " alv 14,00% summa eur "
+
+
+@register("1389643", "1394052")
+class FreshfishParser(SplitAmountParser):
+    """FINNISH FRESHFISH OY, HÄTÄLÄ OY F56451."""
+
+    separator = "14,00 %"
+
+
+@register("1276917", "1375629")
+class AlvErittelyParser(VendorParser):
+    """KANTA-HÄMEEN TUORETUOTE OY, Tukkutalo Heinonen Oy: 'alv-erittely' net/VAT pairs."""
+
+    def parse_match(self, match, output):
+        tokens = match.group(1).strip().replace(",", ".").split(" ")
+
+        values = []
+        for item in tokens:
+            try:
+                values.append(float(item))
+            except ValueError:
+                pass  # skip items that cannot be converted to float
+
+        if "14.00%" in tokens and "25.50%" in tokens and len(values) == 4:
+            _set_rate(output, "14", values[0], values[1], values[0] + values[1])
+            _set_rate(output, "24", values[2], values[3], values[2] + values[3])
+        elif "14.00%" in tokens and len(values) == 2:
+            _set_rate(output, "14", values[0], values[1], values[0] + values[1])
+        elif "25.50%" in tokens and len(values) == 2:
+            _set_rate(output, "24", values[0], values[1], values[0] + values[1])
+
+
+@register("1714901")
+class AgricaParser(VendorParser):
+    """AGRICA AB: 7 values for a single rate, 11 values for both rates."""
+
+    def parse_match(self, match, output):
+        values = [float(j) for j in match.group(1).strip().split(" ")]
+
+        if len(values) == 11:
+            _set_rate(output, "14", *values[1:4])
+            _set_rate(output, "24", *values[5:8])
+        if len(values) == 7 and values[0] == 14:
+            _set_rate(output, "14", *values[1:4])
+            _set_rate(output, "24", 0, 0, 0)
+        if len(values) == 7 and values[0] == 25.5:
+            _set_rate(output, "14", 0, 0, 0)
+            _set_rate(output, "24", *values[1:4])
+
+
+@register("2000009")
+class FisuPojatParser(VendorParser):
+    """Fisu Pojat Oy: amounts are printed without separators between them."""
+
+    def parse_match(self, match, output):
+        chars = [*match.group(1).strip().replace(" ", "").replace(",", ".")]
+        # Every amount has two decimals, so a space after them splits the amounts.
+        for c in range(len(chars)):
+            if chars[c] == ".":
+                chars.insert(c + 3, " ")
+
+        values = [float(i) for i in "".join(chars).strip().split(" ")]
+        if len(values) == 3 and values[2] == values[1] + values[0]:
+            _set_rate(output, "14", *values)
+
+
+@register("1553180")
+class HartwallParser(VendorParser):
+    """Oy Hartwall Ab: 'rate net vat total' rows."""
+
+    def parse_match(self, match, output):
+        tokens = match.group(1).strip().replace(" %", "%")
+        tokens = tokens.replace(",", ".").split(" ")
+        if "14%" in tokens and "24%" in tokens:
+            _set_rate(output, "14", *(float(i) for i in tokens[1:4]))
+            _set_rate(output, "24", *(float(i) for i in tokens[5:8]))
+        elif "14%" in tokens:
+            _set_rate(output, "14", *(float(i) for i in tokens[1:4]))
+        elif "24%" in tokens:
+            _set_rate(output, "24", *(float(i) for i in tokens[1:4]))
+
+
+@register("1433275")
+class KeskoParser(VendorParser):
+    """Kesko Oyj: 'net rate vat total' rows, 25.5% first when both rates exist."""
+
+    location_overrides = {"L102": "L526"}
+
+    def parse(self, text, output):
+        self.override_location(output)
+        return super().parse(text, output)
+
+    def parse_match(self, match, output):
+        values = [float(i) for i in match.group(1).strip().replace(",", ".").split(" ")]
+        if len(values) == 4:
+            if values[1] == 14:
+                _set_rate(output, "14", values[0], values[2], values[3])
+            elif values[1] == 25.5:
+                _set_rate(output, "24", values[0], values[2], values[3])
+        elif len(values) == 8:
+            _set_rate(output, "24", values[0], values[2], values[3])
+            _set_rate(output, "14", values[4], values[6], values[7])
+
+
+@register("1301716")
+class TingstadParser(VendorParser):
+    """AB Tingstad Papper: posted without amounts."""
+
+    groups = 0
+
+    def parse(self, text, output):
+        return output
+
+
+@register("1566645")
+class YellowServiceParser(VendorParser):
+    """Yellow Service Oy Grönroos: a single 25.5% row."""
+
+    def parse_match(self, match, output):
+        values = [float(i) for i in match.group(1).strip().replace(",", ".").split(" ")]
+        _set_rate(output, "24", *values[1:4])
+
+
+@register("2000224")
+class FinBluParser(VendorParser):
+    """FinBlu Safety Oy: VAT per rate and a combined net, the 25.5% net is derived."""
+
+    def parse_match(self, match, output):
+        parts = match.group(1).replace(",", ".").split("arvonlisävero")
+        parts = [i.strip() for i in parts if i != "" and i != " "]
+        for i in parts:
+            if "0 % " in i:
+                # The VAT of the 0% line, its net is part of the combined net.
+                output["0"] = float(i.replace("0 % ", ""))
+            if "14 % " in i:
+                output["14"] = float(i.replace("14 % ", ""))
+            if "25.5 % " in i:
+                output["24"] = float(i.replace("25.5 % ", ""))
+            if "a " in i:
+                output["net"] = float(i.replace("a ", "").replace(" ", ""))
+        if "net" in output and "24" not in output:
+            output["14_net"] = output["net"]
+            output["14_total"] = round(output["14_net"] + output["14"], 2)
+
+        if "net" in output and "14" not in output:
+            output["24_net"] = output["net"]
+            output["24_total"] = round(output["24_net"] + output["24"], 2)
+
+        if "net" in output and "14" in output and "24" in output:
+            output["24_net"] = round(output["24"] / 0.255, 2)
+            output["14_net"] = round(output["net"] - output["24_net"], 2)
+            output["14_total"] = round(output["14_net"] + output["14"], 2)
+            output["24_total"] = round(output["24_net"] + output["24"], 2)
+
+
+@register("1357805", "2000219")
+class SpartaoParser(VendorParser):
+    """SPARTAO OY, Firewok Finland Oy: 'rate net eur vat eur' rows."""
+
+    def parse_match(self, match, output):
+        tokens = match.group(1).strip().replace(",", ".").split(" ")
+        for j in range(len(tokens)):
+            if tokens[j] in ("14%", "24%"):
+                net, vat = float(tokens[j + 1]), float(tokens[j + 3])
+                _set_rate(output, tokens[j][:-1], net, vat, round(net + vat, 2))
+
+
+def build_registry(expressions, regions=None):
+    """
+    Compile and validate the expression of every vendor and return a dictionary
+    of vendor ID -> parser instance, holding the vendor's PDF region if one is declared.
+
+    Raises ValueError when a vendor has no parser class or an invalid expression.
+    """
+    registry = {}
+    for vendor_id, (name, expression, approver) in expressions.items():
+        if vendor_id not in PARSER_CLASSES:
+            raise ValueError(f"No parser registered for vendor {vendor_id} ({name}).")
+        try:
+            registry[vendor_id] = PARSER_CLASSES[vendor_id](
+                vendor_id, name, expression, approver, (regions or {}).get(vendor_id)
+            )
+        except re.error as e:
+            raise ValueError(
+                f"Invalid expression for vendor {vendor_id} ({name}): {e}"
+            ) from e
+    return registry
+
+
+VENDOR_PARSERS = build_registry(get_expressions(), get_regions())
+
+
+def get_parser(vendor):
+    return VENDOR_PARSERS[vendor]
@@ -1,10 +1,74 @@
+import os
 import sys
+import json
 import logging
 from selenium.webdriver.common.by import By
-from utils.webdriver_utils import wait_for_element
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import WebDriverException
+from utils.webdriver_utils import wait_for_element, switch_to_default_content
 
+# Fields of a Chrome DevTools cookie accepted by Network.setCookies.
+_COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite")
 
-def bw_login(driver, username, password, login_url):
+
+def save_session(driver, session_path):
+    """
+    Save the cookies of the browser to a file readable only by the current user.
+
+    Parameters:
+    - driver: Selenium WebDriver instance.
+    - session_path (str): The path of the session file.
+    """
+    try:
+        cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+        os.makedirs(os.path.dirname(session_path) or ".", exist_ok=True)
+        tmp_path = f"{session_path}.tmp"
+        with open(
+            os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w"
+        ) as f:
+            json.dump(cookies, f)
+        os.replace(tmp_path, session_path)
+        logging.info(f"Saved {len(cookies)} session cookies to '{session_path}'.")
+    except (OSError, WebDriverException) as e:
+        logging.warning(f"Failed to save the browser session: {e}")
+
+
+def restore_session(driver, session_path):
+    """
+    Load the cookies saved by save_session into the browser, before any page is opened.
+
+    Returns:
+    - bool: True if cookies were restored.
+    """
+    try:
+        with open(session_path, encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return False
+    cookies = []
+    for cookie in saved:
+        restored = {key: cookie[key] for key in _COOKIE_FIELDS if key in cookie}
+        if not cookie.get("session") and cookie.get("expires", -1) > 0:
+            restored["expires"] = cookie["expires"]
+        cookies.append(restored)
+    try:
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+    except WebDriverException as e:
+        logging.warning(f"Failed to restore the browser session: {e}")
+        return False
+    logging.info(f"Restored {len(cookies)} session cookies from '{session_path}'.")
+    return True
+
+
+def is_login_page(driver):
+    """
+    Check whether Basware shows its login form, e.g. after the session expired.
+    """
+    switch_to_default_content(driver)
+    return bool(driver.find_elements(By.ID, "txtUsername"))
+
+
+def bw_login(driver, username, password, login_url, reuse_session=False):
     """
     Logs into a website using the provided credentials.
 
@@ -13,9 +77,25 @@ def bw_login(driver, username, password, login_url):
     - username: Username for login.
     - password: Password for login.
     - login_url: URL of the login page.
+    - reuse_session: Skip the login when the page opens already logged in, e.g. with
+      cookies restored by restore_session.
     """
     try:
         driver.get(login_url)
+        if reuse_session:
+            # One check: whichever of the menu and the login form shows up first.
+            logged_in = (
+                WebDriverWait(driver, 10)
+                .until(
+                    lambda d: d.find_elements(By.ID, "Menu1-menuItem003")
+                    or d.find_elements(By.ID, "txtUsername")
+                )[0]
+                .get_attribute("id")
+                != "txtUsername"
+            )
+            if logged_in:
+                logging.info("Basware session is still valid, login skipped.")
+                return True
         wait_for_element(
             driver, (By.ID, "txtUsername"), "find the username field and fill"
         ).send_keys(username)
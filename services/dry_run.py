@@ -0,0 +1,114 @@
+import os
+import logging
+import threading
+import datetime as dt
+from concurrent.futures import wait
+
+import pandas as pd
+
+logging = logging.getLogger(__name__)
+
+
+class DryRunReport:
+    """
+    Posting information extracted by a dry run, written to a local CSV report instead
+    of being posted to Basware.
+
+    It takes the place of the StatusWriter in run_worker_pool, so the statuses of a dry
+    run are only written to the report, never journaled or uploaded to SharePoint.
+    """
+
+    def __init__(self, path=None):
+        """
+        Parameters:
+        - path (str): The report file, defaults to DRY_RUN_REPORT_PATH or a timestamped
+          file in LOG_DIRECTORY.
+        """
+        timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.path = path or os.getenv(
+            "DRY_RUN_REPORT_PATH",
+            os.path.join(
+                os.getenv("LOG_DIRECTORY", "logs"), f"dry_run_{timestamp}.csv"
+            ),
+        )
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._extractions = []
+
+    def _row(self, vendor, invoice_num):
+        # Rows are keyed by the vendor ID, the bot input has 'name / ID' vendors.
+        key = (vendor.split(" / ")[-1], str(invoice_num))
+        return self._rows.setdefault(
+            key, {"vendor": key[0], "invoice_num": key[1], "status": None}
+        )
+
+    def track(self, vendor, invoice_num, extraction):
+        """
+        Add the posting information of the invoice to the report when its extraction
+        is done.
+
+        Parameters:
+        - extraction (Future): Resolves to the ExtractionResult of the invoice.
+        """
+
+        def done(future):
+            try:
+                result = future.result()
+                posting_info, error = result.posting_info, result.error
+                seconds = result.seconds
+            except Exception as e:
+                posting_info, error, seconds = None, f"{type(e).__name__}: {e}", None
+            if error is None and not isinstance(posting_info, dict):
+                # info_extractor returns a message when the vendor parser fails.
+                posting_info, error = None, posting_info
+            with self._lock:
+                row = self._row(vendor, invoice_num)
+                row.update(error=error, extract_seconds=seconds, **(posting_info or {}))
+
+        with self._lock:
+            self._extractions.append(extraction)
+        extraction.add_done_callback(done)
+
+    def start(self):
+        pass
+
+    def update(self, index, row, status):
+        """
+        Set the status of the invoice in the browser, 'Success' once its PDF is queued
+        for extraction.
+        """
+        with self._lock:
+            self._row(row["vendor"], row["invoice_num"])["status"] = status
+
+    def close(self):
+        """
+        Wait for the queued extractions and write the report.
+        """
+        with self._lock:
+            extractions = list(self._extractions)
+        wait(extractions)
+        self.write()
+
+    def write(self):
+        """
+        Write the report: a row per invoice with its vendor ID, invoice number, status,
+        extraction error and seconds, and the posting information.
+
+        Returns:
+        - str: The path of the report.
+        """
+        with self._lock:
+            rows = [dict(row) for row in self._rows.values()]
+        for row in rows:
+            if row.get("error") is not None:
+                row["status"] = "Failed"
+        report = pd.DataFrame(rows)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        report.to_csv(self.path, index=False, sep=";", encoding="utf-8-sig")
+
+        failed = sum(row["status"] != "Success" for row in rows)
+        logging.info(
+            f"Dry run report of {len(rows)} invoices, {failed} failed, written to "
+            f"'{self.path}'."
+        )
+        return self.path
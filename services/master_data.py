@@ -0,0 +1,125 @@
+import io
+import os
+import json
+import logging
+import threading
+from collections import namedtuple
+
+import pandas as pd
+
+from config.logger_config import str_to_bool
+from services.sharepoint import download_file, get_file_properties
+
+MasterData = namedtuple("MasterData", ["location", "version"])
+
+_master_data = None
+_master_data_lock = threading.Lock()
+
+
+def _cache_paths():
+    cache_directory = os.getenv("CACHE_DIRECTORY", "cache")
+    return (
+        os.path.join(cache_directory, "master_location.pkl"),
+        os.path.join(cache_directory, "master_location.json"),
+    )
+
+
+def _cached_version(file_path):
+    """
+    Return the version of the cached master data of the given SharePoint file, or None.
+    """
+    _, meta_path = _cache_paths()
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("file_path") != file_path:
+        return None
+    return meta.get("version")
+
+
+def _read_cache(file_path):
+    """
+    Return the cached MasterData of the given SharePoint file, or None if there is no cache.
+    """
+    version = _cached_version(file_path)
+    if version is None:
+        return None
+    data_path, _ = _cache_paths()
+    try:
+        return MasterData(pd.read_pickle(data_path), version)
+    except Exception as e:
+        logging.warning(f"Failed to read the master data cache: {e}")
+        return None
+
+
+def _write_cache(file_path, master_data):
+    data_path, meta_path = _cache_paths()
+    os.makedirs(os.path.dirname(data_path) or ".", exist_ok=True)
+    master_data.location.to_pickle(f"{data_path}.tmp")
+    os.replace(f"{data_path}.tmp", data_path)
+    with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+        json.dump({"file_path": file_path, "version": master_data.version}, f)
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+
+def _load_master_data():
+    file_path = os.getenv("MASTER_DATA_PATH")
+    offline = str_to_bool(os.getenv("MASTER_DATA_OFFLINE", "False"))
+
+    version = None
+    if not offline:
+        properties = get_file_properties(file_path)
+        if properties is not None:
+            version = properties.get("ETag") or properties.get("TimeLastModified")
+
+    if version is not None and _cached_version(file_path) == version:
+        master_data = _read_cache(file_path)
+        if master_data is not None:
+            logging.info(f"Master data version {version} loaded from cache.")
+            return master_data
+
+    if version is not None:
+        try:
+            content = download_file(file_path)
+            if content is None:
+                raise RuntimeError(f"Failed to download master data '{file_path}'.")
+            master_data = MasterData(
+                pd.read_excel(io.BytesIO(content), sheet_name="Location"), version
+            )
+        except Exception as e:
+            logging.warning(f"Failed to load master data version {version}: {e}")
+        else:
+            try:
+                _write_cache(file_path, master_data)
+            except OSError as e:
+                logging.warning(f"Failed to cache the master data: {e}")
+            logging.info(f"Master data version {version} downloaded and cached.")
+            return master_data
+
+    # Offline mode, SharePoint could not be reached or the download failed: use the
+    # cached copy.
+    master_data = _read_cache(file_path)
+    if master_data is None:
+        raise RuntimeError(
+            f"Master data '{file_path}' is neither reachable nor cached."
+        )
+    logging.warning(f"Using cached master data version {master_data.version}.")
+    return master_data
+
+
+def get_master_data():
+    """
+    Return the master data, loading it on first use.
+
+    The 'Location' sheet is cached on disk and keyed by the ETag (or modified time)
+    of the SharePoint file, so the Excel file is only downloaded and parsed when it
+    changed. With MASTER_DATA_OFFLINE=True, or when SharePoint is unreachable or the
+    file fails to download or parse, the cached copy is used.
+    """
+    global _master_data
+    with _master_data_lock:
+        if _master_data is None:
+            _master_data = _load_master_data()
+    return _master_data
@@ -0,0 +1,90 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logging = logging.getLogger(__name__)
+
+# Stages of the invoice pipeline in order, and the waits between them.
+# fetch: open the invoice and download its PDF, in the browser.
+# extract: extract and parse the PDF, in an extraction process.
+# prepare: fill the invoice fields that do not depend on the PDF, once it is extracted.
+# post: write the posting rows, post and save the invoice, in the browser.
+# extract_queue: the browser waits for room in the extraction queue.
+# extract_wait: the browser waits for the extraction of the PDF it downloaded.
+STAGES = ("fetch", "extract", "prepare", "post", "extract_queue", "extract_wait")
+
+
+class StageStats:
+    """
+    Time spent in each pipeline stage, to show which stage limits the throughput.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def add(self, stage, seconds, end=None):
+        """
+        Record an item that spent the given seconds in the stage, ending at the given
+        time.monotonic() value, by default now.
+        """
+        end = time.monotonic() if end is None else end
+        with self._lock:
+            stats = self._stages.setdefault(
+                stage, {"items": 0, "busy": 0.0, "first": end - seconds, "last": end}
+            )
+            stats["items"] += 1
+            stats["busy"] += seconds
+            stats["first"] = min(stats["first"], end - seconds)
+            stats["last"] = max(stats["last"], end)
+
+    @contextmanager
+    def measure(self, stage):
+        """
+        Record the time spent in the with block as an item of the stage.
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(stage, time.monotonic() - start)
+
+    def summary(self):
+        """
+        Returns:
+        - dict: For every stage, the items, the busy seconds, the mean seconds per item and
+          the items per minute over the time the stage was active.
+        """
+        with self._lock:
+            stages = {stage: dict(stats) for stage, stats in self._stages.items()}
+        summary = {}
+        order = lambda s: STAGES.index(s) if s in STAGES else len(STAGES)
+        for stage in sorted(stages, key=order):
+            stats = stages[stage]
+            active = stats["last"] - stats["first"]
+            summary[stage] = {
+                "items": stats["items"],
+                "busy": stats["busy"],
+                "mean": stats["busy"] / stats["items"],
+                "per_minute": 60 * stats["items"] / active if active > 0 else None,
+            }
+        return summary
+
+    def log(self):
+        """
+        Log the summary of every stage.
+        """
+        for stage, stats in self.summary().items():
+            per_minute = (
+                f"{stats['per_minute']:.1f}/min"
+                if stats["per_minute"] is not None
+                else "n/a"
+            )
+            logging.info(
+                f"Pipeline stage '{stage}': {stats['items']} invoices, "
+                f"{stats['busy']:.1f}s busy, {stats['mean']:.2f}s per invoice, {per_minute}."
+            )
+
+
+pipeline_stats = StageStats()
@@ -0,0 +1,126 @@
+import logging
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import Select
+from config.posting_config import TAX_RATES, LOCATION_DIMENSIONS
+from utils.webdriver_utils import wait_for_element, iframe_context, fill_form
+
+logging = logging.getLogger(__name__)
+
+POSTING_ROW_XPATH = "/html/body/form/div[3]/div/div[3]/table/tbody/tr[{row}]"
+
+# Row of the posting grid table holding the first posting row.
+FIRST_POSTING_ROW = 2
+
+
+def posting_lines(posting_info, tax_rates=TAX_RATES):
+    """
+    Return the VAT lines of the posting information, in the order of the rate table.
+
+    Lines with a zero gross amount are left out.
+
+    Parameters:
+    - posting_info (dict): The info_extractor output.
+    - tax_rates (dict): Key of the rate in the posting information -> Basware tax code.
+
+    Returns:
+    - list: (rate key, gross amount, tax code) per VAT line.
+
+    Raises:
+    - ValueError: if a rate has no gross amount or no tax code configured, so the
+      invoice fails instead of being posted without the line.
+    """
+    lines = []
+    for rate, tax_code in tax_rates.items():
+        if rate not in posting_info and f"{rate}_total" not in posting_info:
+            continue
+        if f"{rate}_total" not in posting_info:
+            raise ValueError(f"The '{rate}' rate has no gross amount.")
+        amount = posting_info[f"{rate}_total"]
+        if amount == 0:
+            continue
+        if tax_code is None:
+            raise ValueError(f"No Basware tax code configured for the '{rate}' rate.")
+        lines.append((rate, amount, tax_code))
+    return lines
+
+
+def posting_row_fields(row, posting_info, amount=None, tax_code=None):
+    """
+    Field locators and values of a row of the posting grid, in the order they are filled.
+
+    Parameters:
+    - row (int): The row of the posting grid table, 2 for the first posting row.
+    - posting_info (dict): The posting information, with the location and optionally
+      the department and class code.
+    - amount (float): The gross amount, entered as debit when positive and as credit when negative.
+    - tax_code (str): The Basware tax code of the row.
+    """
+    xpath = POSTING_ROW_XPATH.format(row=row)
+    fields = {}
+    if "department" in posting_info:
+        fields[(By.XPATH, f"{xpath}/td[2]/div/div/input")] = posting_info["department"]
+    if "class_code" in posting_info:
+        fields[(By.XPATH, f"{xpath}/td[4]/div/div/input")] = posting_info["class_code"]
+    fields[(By.XPATH, f"{xpath}/td[3]/div/div/input")] = posting_info["location"]
+    if amount is not None:
+        if amount >= 0:
+            fields[(By.XPATH, f"{xpath}/td[7]/input")] = str(amount).replace(".", ",")
+        else:
+            fields[(By.XPATH, f"{xpath}/td[8]/input")] = str(-amount).replace(".", ",")
+    if tax_code is not None:
+        fields[(By.XPATH, f"{xpath}/td[5]/div/div/input")] = tax_code
+    return fields
+
+
+def posting_row_save_button(row):
+    """
+    Locator of the save button of a row of the posting grid.
+    """
+    return (By.XPATH, f"{POSTING_ROW_XPATH.format(row=row)}/td[9]/a[1]")
+
+
+def write_posting_rows(driver, posting_info):
+    """
+    Write and save a posting row for every VAT line of the posting information.
+
+    The department and class of the location are added from LOCATION_DIMENSIONS, the
+    VAT handling is set to 'Tax included' and each row is filled and saved with one
+    fill_form call, before the next row is filled. Nothing is written when the location
+    was not matched.
+
+    Parameters:
+    - driver: Selenium WebDriver instance.
+    - posting_info (dict): The info_extractor output.
+
+    Returns:
+    - int: The number of rows written.
+    """
+    with iframe_context(driver, "posting_iframe"):
+        posting_sum = Select(
+            wait_for_element(
+                driver,
+                (By.ID, "PostingControl1_VATHandlingCtrl"),
+                "find the posting sum",
+            )
+        )
+        if "location" not in posting_info:
+            return 0
+        posting_info.update(LOCATION_DIMENSIONS.get(posting_info["location"], {}))
+        lines = posting_lines(posting_info)
+        if not lines:
+            return 0
+
+        logging.info("Change to Tax included.")
+        posting_sum.select_by_visible_text("Tax included")
+        # Rows cannot be filled and saved together: saving a row posts the grid back to
+        # Basware, and the next row only exists in the grid rendered after that. Each
+        # row is filled and saved with one JavaScript call.
+        for row, (rate, amount, tax_code) in enumerate(lines, FIRST_POSTING_ROW):
+            logging.info(f"Updating {rate}% row.")
+            fill_form(
+                driver,
+                posting_row_fields(row, posting_info, amount, tax_code),
+                f"updating {rate}% row",
+                click=posting_row_save_button(row),
+            )
+    return len(lines)
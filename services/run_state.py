@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logging = logging.getLogger(__name__)
+
+# Stages of an invoice in the order they are completed.
+STAGES = ("opened", "pdf_extracted", "posted", "saved")
+
+# Status of invoices posted by a run that stopped before saving them, they are not reopened.
+POSTED_NOT_SAVED = "Posted Not Saved"
+
+
+class RunState:
+    """
+    Local store of the stage every invoice reached, and of its extracted posting information.
+
+    Each stage is committed to SQLite as soon as it is completed, so a run restarted after a
+    crash resumes every invoice from its last completed stage, and never reopens an invoice
+    that was already posted. The connection is opened lazily and shared by the worker threads.
+
+    Invoices not updated for max_age seconds are removed when the store is opened. By then
+    the statuses of the run that recorded them are on SharePoint, and an invoice an operator
+    set back to blank or 'Failed' in the bot input is processed again.
+    """
+
+    def __init__(self, path=None, max_age=None):
+        """
+        Parameters:
+        - path (str): The SQLite database file, defaults to RUN_STATE_PATH or
+          'run_state.sqlite3' in CACHE_DIRECTORY.
+        - max_age (float): Seconds an invoice is kept after its last update, defaults to
+          RUN_STATE_MAX_AGE_HOURS or 24 hours.
+        """
+        self.path = path or os.getenv(
+            "RUN_STATE_PATH",
+            os.path.join(os.getenv("CACHE_DIRECTORY", "cache"), "run_state.sqlite3"),
+        )
+        self.max_age = (
+            max_age
+            if max_age is not None
+            else float(os.getenv("RUN_STATE_MAX_AGE_HOURS", 24)) * 3600
+        )
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._connection = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False
+            )
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=FULL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS invoices ("
+                "vendor TEXT NOT NULL, invoice_num TEXT NOT NULL, "
+                "stage INTEGER NOT NULL, posting_info TEXT, updated REAL NOT NULL, "
+                "PRIMARY KEY (vendor, invoice_num))"
+            )
+            with self._connection:
+                expired = self._connection.execute(
+                    "DELETE FROM invoices WHERE updated < ?",
+                    (time.time() - self.max_age,),
+                ).rowcount
+            if expired:
+                logging.info(f"Removed {expired} expired invoices from '{self.path}'.")
+        return self._connection
+
+    def _row(self, vendor, invoice_num):
+        with self._lock:
+            return (
+                self._connect()
+                .execute(
+                    "SELECT stage, posting_info FROM invoices "
+                    "WHERE vendor = ? AND invoice_num = ?",
+                    (str(vendor), str(invoice_num)),
+                )
+                .fetchone()
+            )
+
+    def stage(self, vendor, invoice_num):
+        """
+        Return the last completed stage of the invoice, or None if it was not started.
+        """
+        row = self._row(vendor, invoice_num)
+        return STAGES[row[0]] if row is not None else None
+
+    def reached(self, vendor, invoice_num, stage):
+        """
+        Return True if the invoice completed the given stage, or a later one.
+        """
+        row = self._row(vendor, invoice_num)
+        return row is not None and row[0] >= STAGES.index(stage)
+
+    def posting_info(self, vendor, invoice_num):
+        """
+        Return the posting information extracted for the invoice, or None.
+        """
+        row = self._row(vendor, invoice_num)
+        if row is None or row[1] is None:
+            return None
+        return json.loads(row[1])
+
+    def record(self, vendor, invoice_num, stage, posting_info=None):
+        """
+        Commit the completion of a stage of the invoice. A stage earlier than the recorded
+        one does not move the invoice back, and the posting information is kept unless a
+        new one is given.
+        """
+        data = None
+        if posting_info is not None:
+            data = json.dumps(posting_info, ensure_ascii=False)
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT INTO invoices VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (vendor, invoice_num) DO UPDATE SET "
+                    "stage = MAX(stage, excluded.stage), "
+                    "posting_info = COALESCE(excluded.posting_info, posting_info), "
+                    "updated = excluded.updated",
+                    (
+                        str(vendor),
+                        str(invoice_num),
+                        STAGES.index(stage),
+                        data,
+                        time.time(),
+                    ),
+                )
+
+    def clear(self, vendor=None, invoice_num=None):
+        """
+        Remove the recorded stages of an invoice, or of every invoice when none is given,
+        so they are processed again according to the bot input.
+
+        Returns:
+        - int: The number of invoices removed.
+        """
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                if vendor is None:
+                    return connection.execute("DELETE FROM invoices").rowcount
+                return connection.execute(
+                    "DELETE FROM invoices WHERE vendor = ? AND invoice_num = ?",
+                    (str(vendor), str(invoice_num)),
+                ).rowcount
+
+    def resume(self, df):
+        """
+        Set the status of the bot input rows whose invoice was posted by an earlier run:
+        'Success' when it was saved, POSTED_NOT_SAVED otherwise, so neither is reopened.
+
+        Returns:
+        - int: The number of rows updated.
+        """
+        updated = 0
+        for index, row in df.iterrows():
+            vendor = row["vendor"].split(" / ")[-1]
+            stage = self.stage(vendor, row["invoice_num"])
+            if stage == "saved":
+                status = "Success"
+            elif stage == "posted":
+                status = POSTED_NOT_SAVED
+                logging.warning(
+                    f"Invoice {row['invoice_num']} from {row['vendor']} was posted but not "
+                    "saved by an earlier run, check it in Basware."
+                )
+            else:
+                continue
+            if row["status"] != status:
+                df.at[index, "status"] = status
+                updated += 1
+        if updated:
+            logging.info(f"Resumed {updated} invoice statuses from '{self.path}'.")
+        return updated
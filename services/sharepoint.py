@@ -1,5 +1,8 @@
 import io
 import os
+import time
+import threading
+import requests
 from shareplum import Site
 from shareplum import Office365
 from shareplum.site import Version
@@ -8,9 +11,9 @@ import logging
 from io import StringIO
 
 
-def get_site():
+def _authenticate():
     """
-    Authenticate and get the SharePoint site instance.
+    Authenticate with Office 365 and create the SharePoint site instance.
     """
     office_site = os.getenv("OFFICE_SITE")
     username = os.getenv("OFFICE_USN")
@@ -25,14 +28,126 @@ def get_site():
     return site
 
 
+def _is_auth_error(error):
+    """
+    Check whether a SharePoint request failed with 401 or 403, i.e. the cookies expired.
+    """
+    while error is not None:
+        response = getattr(error, "response", None)
+        if response is not None and response.status_code in (401, 403):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class SharePointSession:
+    """
+    Process-wide SharePoint site, authenticated once and reused until its cookies expire.
+
+    The site and its folders are created on first use and kept for max_age seconds, or
+    until a request fails with 401 or 403, after which the call is retried once with a
+    newly authenticated site. Requests share one pool of keep-alive connections.
+    """
+
+    def __init__(self, site_factory=_authenticate, max_age=None, pool_size=None):
+        """
+        Parameters:
+        - site_factory: Returns an authenticated shareplum site, e.g. of a local stub
+          SharePoint for testing. Defaults to the Office 365 login with the OFFICE_* and
+          SHAREPOINT_SITE environment variables.
+        - max_age (float): Seconds a site is reused, defaults to SHAREPOINT_SESSION_MAX_AGE
+          or one hour.
+        - pool_size (int): Connections kept open per host, defaults to BW_WORKERS, the
+          CPU count when it is 'auto', or 10 if more.
+        """
+        self.site_factory = site_factory
+        self.max_age = (
+            max_age
+            if max_age is not None
+            else float(os.getenv("SHAREPOINT_SESSION_MAX_AGE", 3600))
+        )
+        workers = os.getenv("BW_WORKERS", "").strip()
+        workers = int(workers) if workers.isdigit() else os.cpu_count() or 0
+        self.pool_size = pool_size or max(10, workers)
+        self.authentications = 0
+        self._site = None
+        self._expires = 0
+        self._folders = {}
+        self._lock = threading.RLock()
+
+    def _mount_pool(self, site):
+        session = getattr(site, "_session", None)
+        if session is None:
+            return
+        for prefix, adapter in list(session.adapters.items()):
+            session.mount(
+                prefix,
+                requests.adapters.HTTPAdapter(
+                    pool_connections=self.pool_size,
+                    pool_maxsize=self.pool_size,
+                    max_retries=adapter.max_retries,
+                ),
+            )
+
+    def site(self):
+        """
+        Return the authenticated site, authenticating when there is none or it is too old.
+        """
+        with self._lock:
+            if self._site is None or time.monotonic() >= self._expires:
+                site = self.site_factory()
+                self._mount_pool(site)
+                self._site = site
+                self._expires = time.monotonic() + self.max_age
+                self._folders = {}
+                self.authentications += 1
+                logging.info("Authenticated to SharePoint.")
+            return self._site
+
+    def folder(self, folder_name):
+        """
+        Return the folder of the site, created once per site.
+        """
+        with self._lock:
+            site = self.site()
+            if folder_name not in self._folders:
+                self._folders[folder_name] = site.Folder(folder_name)
+            return self._folders[folder_name]
+
+    def invalidate(self):
+        """
+        Drop the site, so the next call authenticates again.
+        """
+        with self._lock:
+            self._site = None
+            self._folders = {}
+
+    def call(self, operation):
+        """
+        Call operation(session) and retry it once after authenticating again
+        if it fails with 401 or 403.
+        """
+        try:
+            return operation(self)
+        except Exception as e:
+            if not _is_auth_error(e):
+                raise
+            logging.info("SharePoint session expired, authenticating again.")
+            self.invalidate()
+            return operation(self)
+
+
+sharepoint_session = SharePointSession()
+
+
 def download_csv_data(file_name="bot_status.csv"):
     """
     Download specified invoice data file from SharePoint.
     """
     try:
-        site = get_site()
-        folder = site.Folder("Shared Documents/Tools")
-        response = folder.get_file(file_name)
+        response = sharepoint_session.call(
+            lambda session: session.folder("Shared Documents/Tools").get_file(file_name)
+        )
 
         # Assuming the file is a CSV for this example
         data = io.StringIO(str(response, "ISO-8859-1", errors="replace"))
@@ -51,9 +166,12 @@ def download_file(file_path):
     Download specified invoice data file from SharePoint.
     """
     try:
-        site = get_site()
-        folder = site.Folder(os.path.join(*file_path.split("/")[:-1]))
-        response = folder.get_file(file_path.split("/")[-1])
+        folder_name = os.path.join(*file_path.split("/")[:-1])
+        response = sharepoint_session.call(
+            lambda session: session.folder(folder_name).get_file(
+                file_path.split("/")[-1]
+            )
+        )
 
         logging.info(f"Successfully downloaded '{file_path}' from SharePoint.")
         return response
@@ -63,23 +181,51 @@ def download_file(file_path):
         return None
 
 
+def get_file_properties(file_path):
+    """
+    Get the SharePoint properties (e.g. 'ETag', 'TimeLastModified') of the specified file.
+    """
+    try:
+        folder_name = os.path.join(*file_path.split("/")[:-1])
+        file_name = file_path.split("/")[-1]
+        files = sharepoint_session.call(
+            lambda session: session.folder(folder_name).files
+        )
+        for properties in files:
+            if properties.get("Name") == file_name:
+                return properties
+
+        logging.error(f"File '{file_path}' not found on SharePoint.")
+        return None
+
+    except Exception as e:
+        logging.error(f"Failed to get properties of '{file_path}' from SharePoint: {e}")
+        return None
+
+
 def upload_invoice_data(df, file_name="bot_status.csv"):
     """
     Upload invoice data file to SharePoint.
+
+    Returns:
+    - bool: True if the file was uploaded.
     """
     try:
-        site = get_site()
-        folder = site.Folder("Shared Documents/Tools")
-
         # Convert DataFrame to CSV string
         csv_data = df.to_csv(index=False, sep=";")
         csv_bytes = StringIO(csv_data).getvalue().encode("utf-8")
 
         # Upload the file to SharePoint
-        folder.upload_file(csv_bytes, file_name)
+        sharepoint_session.call(
+            lambda session: session.folder("Shared Documents/Tools").upload_file(
+                csv_bytes, file_name
+            )
+        )
 
         logging.info(f"Successfully uploaded '{file_name}' to SharePoint.")
+        return True
     except Exception as e:
         logging.error(
             f"Failed to upload '{file_name}' to SharePoint: {e}", exc_info=True
         )
+        return False
@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+
+from services.sharepoint import upload_invoice_data
+
+logging = logging.getLogger(__name__)
+
+
+class StatusJournal:
+    """
+    Append-only journal of invoice status changes in a local JSON lines file.
+
+    Every change is flushed to disk before it is uploaded to SharePoint, so the statuses
+    of a run that crashed before its upload can be replayed by the next run. Entries are
+    removed once an upload containing them succeeded.
+    """
+
+    def __init__(self, path=None):
+        """
+        Parameters:
+        - path (str): The journal file, defaults to STATUS_JOURNAL_PATH or
+          'status_journal.jsonl' in CACHE_DIRECTORY.
+        """
+        self.path = path or os.getenv(
+            "STATUS_JOURNAL_PATH",
+            os.path.join(os.getenv("CACHE_DIRECTORY", "cache"), "status_journal.jsonl"),
+        )
+        self._lock = threading.Lock()
+        self._end_partial_line()
+        entries = self.entries()
+        self._sequence = entries[-1]["sequence"] if entries else 0
+
+    def _end_partial_line(self):
+        # Terminate a line left partly written by a crash, so the next entry is not appended to it.
+        try:
+            with open(self.path, "rb+") as f:
+                if f.seek(0, os.SEEK_END) == 0:
+                    return
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+        except FileNotFoundError:
+            pass
+
+    def entries(self):
+        """
+        Return the journaled changes in the order they were made. A partly written
+        last line, left by a crash, is skipped.
+        """
+        entries = []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        logging.warning(f"Skipping a damaged line in '{self.path}'.")
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def append(self, vendor, invoice_num, status):
+        """
+        Journal a status change and flush it to disk.
+
+        Returns:
+        - int: The sequence number of the change.
+        """
+        with self._lock:
+            self._sequence += 1
+            entry = {
+                "sequence": self._sequence,
+                "vendor": vendor,
+                "invoice_num": str(invoice_num),
+                "status": status,
+                "time": time.time(),
+            }
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            return self._sequence
+
+    def compact(self, sequence):
+        """
+        Remove the changes up to the given sequence number, after they were uploaded.
+        """
+        with self._lock:
+            remaining = [e for e in self.entries() if e["sequence"] > sequence]
+            if not remaining:
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+                return
+            with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+                for entry in remaining:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(f"{self.path}.tmp", self.path)
+
+    def replay(self, df):
+        """
+        Apply the journaled statuses to the bot input, matched on vendor and invoice number.
+
+        Returns:
+        - int: The number of rows updated.
+        """
+        latest = {(e["vendor"], e["invoice_num"]): e["status"] for e in self.entries()}
+        if not latest:
+            return 0
+        updated = 0
+        for index, row in df.iterrows():
+            status = latest.get((row["vendor"], str(row["invoice_num"])))
+            if status is not None:
+                df.at[index, "status"] = status
+                updated += 1
+        logging.info(f"Replayed {updated} invoice statuses from '{self.path}'.")
+        return updated
+
+
+class StatusWriter(threading.Thread):
+    """
+    Single writer of the bot status: the workers journal their status updates and queue
+    them, and this thread applies them to the DataFrame and uploads it to SharePoint every
+    STATUS_FLUSH_INVOICES updates or STATUS_FLUSH_SECONDS seconds, and at shutdown.
+    """
+
+    def __init__(
+        self,
+        df,
+        journal=None,
+        upload=upload_invoice_data,
+        flush_invoices=None,
+        flush_seconds=None,
+    ):
+        super().__init__(name="status-writer", daemon=True)
+        self.df = df
+        self.journal = journal or StatusJournal()
+        self.upload = upload
+        self.flush_invoices = flush_invoices or int(
+            os.getenv("STATUS_FLUSH_INVOICES", 10)
+        )
+        self.flush_seconds = (
+            flush_seconds
+            if flush_seconds is not None
+            else float(os.getenv("STATUS_FLUSH_SECONDS", 60))
+        )
+        self.uploads = 0
+        self._updates = queue.Queue()
+
+    def update(self, index, row, status):
+        """
+        Journal the status of the row and queue it for the next upload.
+        """
+        sequence = self.journal.append(row["vendor"], row["invoice_num"], status)
+        self._updates.put((index, status, sequence))
+
+    def close(self):
+        """
+        Upload the remaining updates and stop the thread.
+        """
+        self._updates.put(None)
+        self.join()
+
+    def _flush(self, sequence):
+        self.uploads += 1
+        if self.upload(self.df):
+            self.journal.compact(sequence)
+            return True
+        logging.warning("Status upload failed, the statuses are kept in the journal.")
+        return False
+
+    def run(self):
+        pending, sequence, first_pending = 0, 0, None
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(0, first_pending + self.flush_seconds - time.monotonic())
+            try:
+                update = self._updates.get(timeout=timeout)
+            except queue.Empty:
+                update = False
+            if update:
+                index, status, sequence = update
+                self.df.at[index, "status"] = status
+                if not pending:
+                    first_pending = time.monotonic()
+                pending += 1
+            due = pending and (
+                update is None
+                or pending >= self.flush_invoices
+                or time.monotonic() - first_pending >= self.flush_seconds
+            )
+            if due and self._flush(sequence):
+                pending = 0
+            elif due:
+                # Retry the failed upload after another interval.
+                first_pending = time.monotonic()
+            if update is None:
+                return
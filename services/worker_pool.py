@@ -0,0 +1,368 @@
+import os
+import sys
+import logging
+import threading
+import datetime as dt
+from collections import deque, namedtuple
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from drivers.webdriver import setup_driver
+from services.authentication import (
+    bw_login,
+    is_login_page,
+    restore_session,
+    save_session,
+)
+from services.status_journal import StatusWriter
+from utils.file_utils import reset_folder
+from utils.timing_utils import step_timer
+from utils.webdriver_utils import switch_to_default_content
+
+logging = logging.getLogger(__name__)
+
+
+def _available_memory():
+    """
+    Return the memory available for new processes in bytes, or None if unknown.
+    """
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_worker_count():
+    """
+    Number of browser workers, each a Basware session of the same account: 1 unless
+    BW_WORKERS is set. BW_WORKERS=auto uses as many as the CPUs and the available memory
+    allow, at BW_WORKER_MEMORY_MB (default 600) per headless Chrome.
+    """
+    workers = os.getenv("BW_WORKERS", "1").strip().lower()
+    if workers != "auto":
+        return max(1, int(workers or 1))
+    count = os.cpu_count() or 1
+    memory = _available_memory()
+    if memory is not None:
+        per_worker = int(os.getenv("BW_WORKER_MEMORY_MB", 600)) * 1024 * 1024
+        count = min(count, memory // per_worker)
+    return max(1, count)
+
+
+def invoice_key(row):
+    """
+    Key identifying the Basware invoice of a bot input row: (vendor ID, invoice number).
+    """
+    return row["vendor"].split(" / ")[-1], str(row["invoice_num"])
+
+
+class InvoiceQueue:
+    """
+    Queue of bot input rows shared by the workers, which never hands out an invoice
+    while another worker has it open, as Basware would show its lock dialog.
+    """
+
+    def __init__(self, rows):
+        """
+        Parameters:
+        - rows: iterable of (index, row) of the bot input.
+        """
+        self._pending = deque(rows)
+        self._in_flight = set()
+        self._condition = threading.Condition()
+
+    def claim(self, vendor=None):
+        """
+        Return the next (index, row) whose invoice is not open in another worker,
+        waiting while all pending ones are. Returns None when the queue is empty.
+
+        Invoices of the given vendor ID are handed out first, so a worker keeps using
+        the result table it already filtered for the vendor.
+        """
+        with self._condition:
+            while self._pending:
+                claimable = [
+                    position
+                    for position, (_, row) in enumerate(self._pending)
+                    if invoice_key(row) not in self._in_flight
+                ]
+                if claimable:
+                    position = next(
+                        (
+                            position
+                            for position in claimable
+                            if invoice_key(self._pending[position][1])[0] == vendor
+                        ),
+                        claimable[0],
+                    )
+                    index, row = self._pending[position]
+                    del self._pending[position]
+                    self._in_flight.add(invoice_key(row))
+                    return index, row
+                self._condition.wait()
+            return None
+
+    def __len__(self):
+        with self._condition:
+            return len(self._pending)
+
+    def release(self, row):
+        """
+        Mark the invoice of the row as no longer open.
+        """
+        with self._condition:
+            self._in_flight.discard(invoice_key(row))
+            self._condition.notify_all()
+
+
+def _login(driver, reuse_session=False):
+    return bw_login(
+        driver,
+        username=os.getenv("BW_USR"),
+        password=os.getenv("BW_PSW"),
+        login_url=os.getenv("BW_URL"),
+        reuse_session=reuse_session,
+    )
+
+
+BrowserSession = namedtuple(
+    "BrowserSession", ["number", "driver", "download_path", "session_path"]
+)
+
+
+def _start_browser(number, download_root, cancelled):
+    """
+    Launch the browser of a worker and log in, unless the launch was cancelled meanwhile.
+    """
+    download_path = os.path.join(download_root, f"worker-{number}")
+    reset_folder(download_path)
+    # The Basware session of every worker is kept between runs when BW_SESSION_DIRECTORY is set.
+    session_directory = os.getenv("BW_SESSION_DIRECTORY")
+    session_path = (
+        os.path.join(session_directory, f"worker-{number}.json")
+        if session_directory
+        else None
+    )
+    driver = setup_driver(download_path=download_path)
+    browser = BrowserSession(number, driver, download_path, session_path)
+    if cancelled.is_set():
+        driver.quit()
+        return None
+    try:
+        switch_to_default_content(driver)
+        reuse_session = session_path is not None and restore_session(
+            driver, session_path
+        )
+        _login(driver, reuse_session)
+    except BaseException:
+        driver.quit()
+        raise
+    return browser
+
+
+def _close_browser(browser):
+    if browser.session_path is not None:
+        save_session(browser.driver, browser.session_path)
+    browser.driver.quit()
+
+
+def _close_launched_browser(future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    if future.result() is not None:
+        _close_browser(future.result())
+
+
+class BrowserLauncher:
+    """
+    Launches and logs in the worker browsers in the background, so they start while the
+    bot input and the master data are still loading.
+    """
+
+    def __init__(self, download_root=None):
+        """
+        Parameters:
+        - download_root (str): Folder of the worker download folders, defaults to TEMP_DIRECTORY.
+        """
+        self.download_root = download_root or os.path.join(
+            os.getcwd(), os.getenv("TEMP_DIRECTORY", "temp")
+        )
+        self._executor = ThreadPoolExecutor(thread_name_prefix="browser-launch")
+        self._futures = []
+        self._launched = 0
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+
+    def launch(self, count):
+        """
+        Start launching browsers until count of them are launching or launched.
+        """
+        with self._lock:
+            while len(self._futures) < count and not self._cancelled.is_set():
+                self._futures.append(
+                    self._executor.submit(
+                        _start_browser,
+                        self._launched,
+                        self.download_root,
+                        self._cancelled,
+                    )
+                )
+                self._launched += 1
+
+    def take(self, count):
+        """
+        Launch count browsers and hand them over to the caller, who closes them.
+
+        Returns:
+        - list: Futures of the BrowserSession of every browser, or of None when the
+          launch was cancelled.
+        """
+        self.launch(count)
+        with self._lock:
+            taken, self._futures = self._futures[:count], self._futures[count:]
+        return taken
+
+    def cancel(self):
+        """
+        Cancel the launches that did not start and close the browsers launched but not taken.
+        """
+        with self._lock:
+            self._cancelled.set()
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future.cancel()
+            future.add_done_callback(_close_launched_browser)
+        self._executor.shutdown(wait=False)
+
+
+def _run_worker(browser_future, invoices, writer, process_invoice):
+    try:
+        browser = browser_future.result()
+    except CancelledError:
+        return
+    except SystemExit:
+        # bw_login exits when the login fails, which only stops this worker.
+        logging.error("Browser worker not started, login to Basware failed.")
+        return
+    except Exception as e:
+        logging.error(f"Browser worker not started: {e}")
+        return
+    if browser is None:
+        return
+    number, driver, download_path, _ = browser
+    try:
+        vendor = None
+        while True:
+            item = invoices.claim(vendor)
+            if item is None:
+                break
+            index, row = item
+            vendor = invoice_key(row)[0]
+            try:
+                logging.info(
+                    f'==================================== Processing invoice {row["invoice_num"]} from {row["vendor"]} ===================================='
+                )
+                reset_folder(download_path)
+                with step_timer.invoice("/".join(invoice_key(row))):
+                    process_invoice(
+                        driver=driver,
+                        vendor=row["vendor"].split(" / ")[-1],
+                        invoice_num=row["invoice_num"],
+                        download_path=download_path,
+                    )
+                writer.update(index, row, "Success")
+                logging.info(
+                    f"Invoice {row['invoice_num']} from {row['vendor']} has been processed successfully!"
+                )
+            except Exception as e:
+                writer.update(index, row, "Failed")
+                logging.error(
+                    f"Invoice {row['invoice_num']} from {row['vendor']} failed! Error message: {e}"
+                )
+                timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+                screenshot_path = os.path.join(
+                    os.getcwd(), f"screenshot_{timestamp}_worker-{number}.png"
+                )
+                try:
+                    driver.save_screenshot(screenshot_path)
+                except Exception as screenshot_error:
+                    # The browser may have crashed, which failed the invoice.
+                    logging.warning(f"Screenshot not saved: {screenshot_error}")
+                if is_login_page(driver):
+                    logging.warning("Basware session expired, logging in again.")
+                    _login(driver)
+            finally:
+                invoices.release(row)
+    except SystemExit:
+        # bw_login exits when the login fails, which only stops this worker.
+        logging.error(f"Worker {number} stopped, login to Basware failed.")
+    finally:
+        _close_browser(browser)
+
+
+def run_worker_pool(
+    df, process_invoice, workers=None, journal=None, launcher=None, writer=None
+):
+    """
+    Process the invoices of the bot input with several logged-in browsers.
+
+    Every worker has its own headless Chrome and download folder, and takes the next
+    invoice from a shared queue. The status of each invoice is journaled, set in the
+    DataFrame and uploaded to SharePoint in batches by a single StatusWriter thread.
+
+    Parameters:
+    - df (DataFrame): The bot input, with 'vendor', 'invoice_num' and 'status' columns.
+    - process_invoice: Called with driver, vendor, invoice_num and download_path per invoice,
+      an exception marks the invoice as failed.
+    - workers (int): Number of browsers, defaults to default_worker_count().
+    - journal (StatusJournal): The status journal, defaults to STATUS_JOURNAL_PATH.
+    - launcher (BrowserLauncher): Launcher of the browsers, which may already have started
+      some of them. Its browsers are closed when there is nothing to process.
+    - writer: Receives the status of every invoice, defaults to a StatusWriter of the
+      bot input and the journal.
+
+    Returns:
+    - DataFrame: The bot input with the updated statuses.
+
+    Exits with status 1, as a failed login did before the workers, when the workers
+    stopped before every invoice was taken, e.g. because no browser could log in.
+    """
+    launcher = launcher or BrowserLauncher()
+    rows = [(index, row) for index, row in df.iterrows() if row["status"] != "Success"]
+    if not rows:
+        logging.info("No invoices to process.")
+        launcher.cancel()
+        return df
+    workers = min(workers or default_worker_count(), len(rows))
+    logging.info(f"Processing {len(rows)} invoices with {workers} browser workers.")
+
+    invoices = InvoiceQueue(rows)
+    writer = writer or StatusWriter(df, journal)
+    writer.start()
+    threads = [
+        threading.Thread(
+            target=_run_worker,
+            args=(browser, invoices, writer, process_invoice),
+            name=f"bw-worker-{number}",
+        )
+        for number, browser in enumerate(launcher.take(workers))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+    # Browsers launched ahead but not needed, if any.
+    launcher.cancel()
+    if len(invoices):
+        logging.error(
+            f"{len(invoices)} invoices not processed, no browser worker is logged in."
+        )
+        sys.exit(1)
+    return df
@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logging = logging.getLogger(__name__)
+
+
+class ExtractionCache:
+    """
+    Size-bounded, least recently used cache of JSON values stored in SQLite.
+
+    Used for the text extracted from invoice PDFs and the parsed posting information,
+    keyed by the SHA-256 of the PDF bytes. The connection is opened lazily in each
+    process, so an instance can be shared with forked worker processes.
+    """
+
+    def __init__(self, path, max_bytes, touch_interval=3600):
+        """
+        Parameters:
+        - path (str): The path of the SQLite database file.
+        - max_bytes (int): Size limit of the stored values, 0 disables the cache.
+        - touch_interval (float): Seconds a hit leaves the last access time of an entry
+          unchanged, so entries accessed within it are evicted in insertion order.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._connection = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False
+            )
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)"
+            )
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, key):
+        """
+        Return the cached value of the key, or None when it is not cached.
+        """
+        if not self.max_bytes:
+            return None
+        try:
+            with self._lock:
+                connection = self._connect()
+                row = connection.execute(
+                    "SELECT value, last_access FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                # A hit is a plain read, the access time is only written once it is
+                # older than touch_interval, which is all the eviction order needs.
+                if now - row[1] > self.touch_interval:
+                    with connection:
+                        connection.execute(
+                            "UPDATE entries SET last_access = ? WHERE key = ?",
+                            (now, key),
+                        )
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            logging.warning(f"Extraction cache lookup failed: {e}")
+            return None
+
+    def put(self, key, value):
+        """
+        Store a JSON serializable value and evict the least recently used entries
+        above the size limit.
+        """
+        if not self.max_bytes:
+            return
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        try:
+            with self._lock:
+                connection = self._connect()
+                with connection:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                        (key, data, size, time.time()),
+                    )
+                    total = connection.execute(
+                        "SELECT SUM(size) FROM entries"
+                    ).fetchone()[0]
+                    rows = connection.execute(
+                        "SELECT key, size FROM entries ORDER BY last_access"
+                    )
+                    evicted = []
+                    for evicted_key, evicted_size in rows:
+                        if total <= self.max_bytes:
+                            break
+                        evicted.append((evicted_key,))
+                        total -= evicted_size
+                    connection.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        except sqlite3.Error as e:
+            logging.warning(f"Extraction cache update failed: {e}")
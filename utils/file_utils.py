@@ -1,6 +1,13 @@
 import os
+import sys
 import time
+import ctypes
+import select
 import shutil
+import logging
+import ctypes.util
+
+logging = logging.getLogger(__name__)
 
 
 def delete_file_by_type(path=None, file_type="pdf"):
@@ -29,25 +36,101 @@ def reset_folder(path=None):
     os.makedirs(path)
 
 
-def is_file_write_complete(file_path, check_interval=1, retries=5):
+class _DirectoryWatcher:
+    """
+    inotify watch on a directory, used to wake up as soon as a file is created,
+    written or renamed in it (Linux only).
     """
-    Check if a file's write operation is complete by comparing its size over a short interval.
+
+    # IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    _MASK = 0x00000008 | 0x00000080 | 0x00000100
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), self._MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {path}")
+
+    def wait(self, timeout):
+        """
+        Block until a file event arrives or the timeout (in seconds) expires.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self.fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _open_watcher(path):
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return _DirectoryWatcher(path)
+    except (OSError, AttributeError, TypeError) as e:
+        logging.info(f"inotify unavailable, polling '{path}' instead: {e}")
+        return None
+
+
+def wait_for_download(path, file_type="pdf", timeout=30, poll_interval=0.05):
+    """
+    Wait until a download of the given file type has completed in the folder.
+
+    Chrome writes to a '.crdownload' file and renames it when the download is
+    done, so the wait resolves as soon as the renamed file exists and its size
+    is stable. On Linux the folder is watched with inotify, elsewhere it is
+    polled every poll_interval seconds.
 
     Parameters:
-    - file_path (str): The path to the file.
-    - check_interval (int): How long to wait between checks (in seconds).
-    - retries (int): How many times to check the file size for changes.
+    - path (str): The download folder.
+    - file_type (str): The file extension to wait for. Defaults to 'pdf'.
+    - timeout (float): Overall deadline in seconds.
+    - poll_interval (float): Polling interval, and the interval of the size check.
 
     Returns:
-    - bool: True if the file size is stable (write operation likely complete), False otherwise.
+    - str: The path of the downloaded file, or None if no single file completed in time.
     """
-    prev_size = -1
-    current_size = os.path.getsize(file_path)
-    while retries > 0:
-        time.sleep(check_interval)
-        prev_size = current_size
-        current_size = os.path.getsize(file_path)
-        if current_size == prev_size:
-            return True
-        retries -= 1
-    return False
+    deadline = time.monotonic() + timeout
+    watcher = _open_watcher(path)
+    try:
+        while True:
+            files = [
+                f
+                for f in os.listdir(path)
+                if f.endswith((f".{file_type}", f".{file_type.upper()}"))
+            ]
+            if len(files) > 1:
+                logging.error(f"Expected one .{file_type} file in '{path}': {files}")
+                return None
+            if files:
+                file_path = os.path.join(path, files[0])
+                size = os.path.getsize(file_path)
+                time.sleep(poll_interval)
+                if size > 0 and os.path.getsize(file_path) == size:
+                    return file_path
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logging.warning(
+                    f"No completed .{file_type} download in '{path}' after {timeout}s."
+                )
+                return None
+            if files:
+                # Still being written, the size check has already waited.
+                continue
+            if watcher is not None:
+                watcher.wait(min(remaining, 1))
+            else:
+                time.sleep(min(poll_interval, remaining))
+    finally:
+        if watcher is not None:
+            watcher.close()
@@ -1,36 +1,119 @@
+import io
 import os
 import pdfplumber
-from utils.file_utils import delete_file_by_type, is_file_write_complete
+from utils.file_utils import delete_file_by_type, wait_for_download
+from utils.text_utils import normalize_text
 
 
-def read_pdf_text(
+def _page_text(page, crop=None):
+    if crop is not None:
+        x0, top, x1, bottom = crop
+        page = page.within_bbox(
+            (
+                x0 * float(page.width),
+                top * float(page.height),
+                x1 * float(page.width),
+                bottom * float(page.height),
+            )
+        )
+    return page.extract_text() or ""
+
+
+def _open_pdf(source):
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return pdfplumber.open(source)
+
+
+def _extract_region_pages(pages, region):
+    """
+    Extract the first page and the region declared for the vendor, by page index.
+    Returns None when the anchor phrase is not found in the cropped region pages.
+    """
+    texts = {0: _page_text(pages[0])}
+    if region.get("pages") == "first":
+        return texts
+
+    anchor = region.get("anchor")
+    crop = region.get("crop")
+    # The VAT summary is at the end of the invoice, so search backwards for the anchor.
+    for index in range(len(pages) - 1, 0, -1):
+        texts[index] = _page_text(pages[index], crop)
+        if anchor is None or anchor in normalize_text(texts[index]).text:
+            return texts
+
+    if anchor is None or crop is None or anchor in normalize_text(texts[0]).text:
+        # Either the region starts on the first page, or every page was already
+        # extracted in full and the text equals the whole document.
+        return texts
+    return None
+
+
+def extract_pdf_text(source, region=None):
+    """
+    Extract the text content of a PDF.
+
+    Parameters:
+    - source (str or bytes): Path of the PDF file, or its content.
+    - region (dict): Optional vendor region from config.re_pattern_config.regions. Only the
+      first page and the region are extracted; the whole document is extracted when the
+      region's anchor phrase is not found.
+
+    Returns:
+    - list: The [page index, text] of the extracted pages, in page order.
+    """
+    with _open_pdf(source) as pdf:
+        texts = None
+        if region and pdf.pages:
+            texts = _extract_region_pages(pdf.pages, region)
+        if texts is None:
+            texts = {index: _page_text(page) for index, page in enumerate(pdf.pages)}
+        return sorted(texts.items())
+
+
+def extract_pdf_pages(source, exclude=()):
+    """
+    Extract the full text of the pages of a PDF that are not excluded.
+
+    Parameters:
+    - source (str or bytes): Path of the PDF file, or its content.
+    - exclude (iterable): Indices of the pages not to extract.
+
+    Returns:
+    - list: The [page index, text] of the extracted pages, in page order.
+    """
+    exclude = set(exclude)
+    with _open_pdf(source) as pdf:
+        return [
+            (index, _page_text(page))
+            for index, page in enumerate(pdf.pages)
+            if index not in exclude
+        ]
+
+
+def read_pdf_bytes(
     path=os.path.join(os.getcwd(), os.getenv("TEMP_DIRECTORY", "temp")), file_type="pdf"
 ):
     """
-    Read the text content from a PDF file.
+    Wait for the PDF download to complete, read its content and clear the download folder.
 
     Parameters:
     - path (str): The path to the folder containing the PDF files. Default is TEMP_PATH.
     - file_type (str): The file extension to search for. Default is 'pdf'.
 
     Returns:
-    - str: The extracted text content if a single PDF file is found. Otherwise returns None.
-    """
-
-    files = [
-        f
-        for f in os.listdir(path)
-        if f.endswith((f".{file_type}", f".{file_type.upper()}"))
-    ]
-    if len(files) == 1:
-        file_path = os.path.join(path, files[0])
-        if is_file_write_complete(file_path):
-            with pdfplumber.open(file_path) as pdf:
-                pdf_text = "".join(
-                    page.extract_text() for page in pdf.pages if page.extract_text()
-                )
-            delete_file_by_type(path, "pdf")
-            delete_file_by_type(path, "tmp")
-            delete_file_by_type(path, "crdownload")
-            return pdf_text
+    - bytes: The file content if a single PDF file is downloaded within DOWNLOAD_TIMEOUT
+      seconds. Otherwise returns None.
+    """
+
+    file_path = wait_for_download(
+        path, file_type, timeout=float(os.getenv("DOWNLOAD_TIMEOUT", 30))
+    )
+    if file_path is not None:
+        with open(file_path, "rb") as f:
+            content = f.read()
+        delete_file_by_type(path, "pdf")
+        delete_file_by_type(path, "tmp")
+        delete_file_by_type(path, "crdownload")
+        return content
     return None
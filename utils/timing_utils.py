@@ -0,0 +1,154 @@
+import os
+import json
+import math
+import time
+import logging
+import threading
+import datetime as dt
+from collections import defaultdict
+from contextlib import contextmanager
+
+from selenium.common.exceptions import TimeoutException
+
+logging = logging.getLogger(__name__)
+
+# Outcomes of a timed action.
+OK = "ok"
+TIMEOUT = "timeout"
+# A timeout the caller expected and caught, e.g. a silent wait for an optional element.
+SWALLOWED_TIMEOUT = "swallowed_timeout"
+# An optional dialog probe that found no dialog.
+PROBE_MISS = "probe_miss"
+
+
+def _percentile(durations, percent):
+    # Nearest-rank percentile of sorted durations.
+    return durations[max(0, math.ceil(percent / 100 * len(durations)) - 1)]
+
+
+class StepTimer:
+    """
+    Records the duration of every browser action (waits, frame switches, clicks,
+    send_keys, form fills and dialog probes), keyed by step name and by the invoice
+    the recording thread is processing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._records = []
+
+    @property
+    def current_invoice(self):
+        return getattr(self._local, "invoice", None)
+
+    @contextmanager
+    def invoice(self, invoice):
+        """
+        Key the actions of the current thread in the with block by the given invoice.
+        """
+        previous = self.current_invoice
+        self._local.invoice = invoice
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._local.invoice = previous
+            self.record(
+                "invoice total", "invoice", time.monotonic() - start, invoice=invoice
+            )
+
+    def record(self, step, kind, seconds, outcome=OK, invoice=None):
+        """
+        Record an action of the given kind that took the given seconds.
+        """
+        invoice = invoice if invoice is not None else self.current_invoice
+        with self._lock:
+            self._records.append((invoice, step, kind, seconds, outcome))
+
+    @contextmanager
+    def timed(self, step, kind, silent=False):
+        """
+        Record the duration of the with block. A TimeoutException is recorded as a
+        timeout, or as a swallowed timeout when silent, and raised again.
+        """
+        start = time.monotonic()
+        outcome = OK
+        try:
+            yield
+        except TimeoutException:
+            outcome = SWALLOWED_TIMEOUT if silent else TIMEOUT
+            raise
+        finally:
+            self.record(step, kind, time.monotonic() - start, outcome)
+
+    def summary(self):
+        """
+        Returns:
+        - dict: The latency summary of every step and kind (count, p50, p95, max and
+          total seconds, and the count of every outcome other than ok), and the time
+          every invoice spent in each kind of action and its slowest steps.
+        """
+        with self._lock:
+            records = list(self._records)
+
+        by_step = defaultdict(list)
+        outcomes = defaultdict(lambda: defaultdict(int))
+        invoices = defaultdict(lambda: defaultdict(float))
+        invoice_steps = defaultdict(lambda: defaultdict(float))
+        for invoice, step, kind, seconds, outcome in records:
+            key = f"{kind}: {step}"
+            by_step[key].append(seconds)
+            if outcome != OK:
+                outcomes[key][outcome] += 1
+            if invoice is not None:
+                invoices[invoice][kind] += seconds
+                if kind != "invoice":
+                    invoice_steps[invoice][key] += seconds
+
+        steps = {}
+        for key, durations in sorted(by_step.items(), key=lambda item: -sum(item[1])):
+            durations.sort()
+            steps[key] = {
+                "count": len(durations),
+                "p50": round(_percentile(durations, 50), 4),
+                "p95": round(_percentile(durations, 95), 4),
+                "max": round(durations[-1], 4),
+                "total": round(sum(durations), 4),
+                **outcomes[key],
+            }
+        breakdown = {}
+        for invoice, kinds in invoices.items():
+            slowest = sorted(invoice_steps[invoice].items(), key=lambda item: -item[1])
+            total = kinds.pop("invoice", None)
+            breakdown[invoice] = {
+                "total": round(total, 4) if total is not None else None,
+                "by_kind": {kind: round(t, 4) for kind, t in kinds.items()},
+                "slowest_steps": {step: round(t, 4) for step, t in slowest[:10]},
+            }
+        return {"steps": steps, "invoices": breakdown}
+
+    def write_report(self, path=None):
+        """
+        Write the summary to a JSON file, by default TIMING_REPORT_PATH or a timestamped
+        file in LOG_DIRECTORY.
+
+        Returns:
+        - str: The path of the report.
+        """
+        if path is None:
+            timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = os.getenv(
+                "TIMING_REPORT_PATH",
+                os.path.join(
+                    os.getenv("LOG_DIRECTORY", "logs"), f"timing_{timestamp}.json"
+                ),
+            )
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2, ensure_ascii=False)
+        logging.info(f"Step timing report written to '{path}'.")
+        return path
+
+
+step_timer = StepTimer()
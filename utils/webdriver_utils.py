@@ -1,20 +1,26 @@
+import os
+import time
 import logging
+import weakref
+import threading
+from collections import Counter, defaultdict
 from contextlib import contextmanager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from models.custom_elements import CustomWebElement
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from utils.timing_utils import OK, PROBE_MISS, step_timer
+from selenium.common.exceptions import (
+    TimeoutException,
+    NoSuchElementException,
+    WebDriverException,
+)
 from config.iframe_config import IFRAME_HIERARCHY
+from config.dialog_config import OPTIONAL_DIALOGS, PROBE_TIMEOUT
 
 logging = logging.getLogger(__name__)
 
 
-def wait_for_element(
-    driver, locator, step_name="not specified", timeout=10, clickable=True, silent=False
-):
-    """
-    Enhanced with more detailed logging.
-    """
+def _find_element(driver, locator, step_name, timeout, clickable, silent):
     try:
         if clickable:
             element = WebDriverWait(driver, timeout).until(
@@ -28,6 +34,7 @@ def wait_for_element(
             logging.info(f"{step_name}: Element {locator} found.")
 
         element.__class__ = CustomWebElement
+        element.step_name = step_name
         return element
 
     except TimeoutException as e:
@@ -38,48 +45,147 @@ def wait_for_element(
         raise
 
 
-def switch_to_iframe_by_name(driver, iframe_name):
+def wait_for_element(
+    driver, locator, step_name="not specified", timeout=10, clickable=True, silent=False
+):
     """
-    Switches to an iframe by its name by navigating through the iframe hierarchy.
-    Collects the 'breadcrumbs' (locator paths) to reach the target iframe,
-    then switches through each iframe sequentially to reach the target.
-    """
-    breadcrumbs = []
-
-    def find_and_switch(iframe_name, iframe_config=IFRAME_HIERARCHY):
-        for key, value in iframe_config.items():
-            if key == iframe_name:
-                breadcrumbs.append(value["locator"])
-                return True
-            elif "children" in value:
-                breadcrumbs.append(value["locator"])  # Add parent iframe locator
-                if find_and_switch(iframe_name, value["children"]):
-                    return True
-                breadcrumbs.pop()  # Remove parent iframe locator if not the correct path
-        return False
+    Enhanced with more detailed logging.
+    The driver is first switched to the frame of the innermost open iframe_context.
+    The duration of the wait is recorded by the step timer, a timeout of a silent wait
+    as swallowed.
+    """
+    _sync_frame(driver, step_name)
+    with step_timer.timed(step_name, "wait", silent=silent):
+        return _find_element(driver, locator, step_name, timeout, clickable, silent)
+
+
+def _flatten_iframe_paths(iframe_config, parent=()):
+    """
+    Map every iframe name to the locators of the iframes to switch through,
+    from the top document down to the iframe.
+    """
+    paths = {}
+    for name, value in iframe_config.items():
+        path = parent + (value["locator"],)
+        paths[name] = path
+        paths.update(_flatten_iframe_paths(value.get("children", {}), path))
+    return paths
+
 
-    if not find_and_switch(iframe_name, IFRAME_HIERARCHY):
+IFRAME_PATHS = _flatten_iframe_paths(IFRAME_HIERARCHY)
+
+
+def _iframe_path(iframe_name):
+    path = IFRAME_PATHS.get(iframe_name)
+    if path is None:
         logging.error(f"Iframe named '{iframe_name}' not found in hierarchy.")
         raise NoSuchElementException(
             f"Iframe named '{iframe_name}' not found in hierarchy."
         )
-    # Switch through iframes using breadcrumbs
-    for locator in breadcrumbs:
+    return path
+
+
+class _FrameState:
+    """
+    The iframe path a driver is switched to, and the path it should be in.
+    """
+
+    def __init__(self):
+        self.current = ()
+        self.base = ()
+        self.contexts = []
+
+    @property
+    def target(self):
+        return self.contexts[-1] if self.contexts else self.base
+
+
+_frame_states = weakref.WeakKeyDictionary()
+
+
+def _frame_state(driver):
+    state = _frame_states.get(driver)
+    if state is None:
+        state = _frame_states[driver] = _FrameState()
+    return state
+
+
+def _switch_from_top(driver, state, path):
+    driver.switch_to.default_content()
+    state.current = ()
+    for locator in path:
         try:
-            # Assuming wait_for_element is defined to wait and return the element
-            iframe_element = wait_for_element(
-                driver, locator, "Switching to iframe", clickable=False, silent=True
+            iframe_element = _find_element(
+                driver,
+                locator,
+                "Switching to iframe",
+                timeout=10,
+                clickable=False,
+                silent=True,
             )
             driver.switch_to.frame(iframe_element)
+            state.current += (locator,)
         except TimeoutException:
             logging.error(f"Failed to switch to iframe with locator {locator}")
             raise
 
 
+def _switch_incrementally(driver, state, path):
+    common = 0
+    for current, target in zip(state.current, path):
+        if current != target:
+            break
+        common += 1
+    if common == 0 or len(state.current) - common > common:
+        # Walking down from the top takes fewer switches than climbing up.
+        _switch_from_top(driver, state, path)
+        return
+    while len(state.current) > common:
+        driver.switch_to.parent_frame()
+        state.current = state.current[:-1]
+    for locator in path[common:]:
+        # The frame is looked up without waiting, a missing frame means the
+        # page changed underneath and the path is resolved again from the top.
+        iframe_elements = driver.find_elements(*locator)
+        if not iframe_elements:
+            raise NoSuchElementException(f"Iframe with locator {locator} not found.")
+        driver.switch_to.frame(iframe_elements[0])
+        state.current += (locator,)
+
+
+def _sync_frame(driver, step_name="switch to iframe"):
+    """
+    Switch the driver to the target frame of its innermost open iframe_context,
+    only across the part of the iframe path that differs from the current one.
+    """
+    state = _frame_state(driver)
+    path = state.target
+    if state.current == path:
+        return
+    with step_timer.timed(step_name, "frame_switch"):
+        try:
+            _switch_incrementally(driver, state, path)
+        except WebDriverException as e:
+            logging.info(f"Switching to iframe path from the top document: {e.msg}")
+            _switch_from_top(driver, state, path)
+
+
+def switch_to_iframe_by_name(driver, iframe_name):
+    """
+    Switches to an iframe by its name using the precomputed iframe paths.
+    Only the iframes that differ from the current path are switched through.
+    """
+    _frame_state(driver).base = _iframe_path(iframe_name)
+    _sync_frame(driver, f"switch to {iframe_name}")
+
+
 def switch_to_default_content(driver):
     """
     Enhanced with logging for clarity.
     """
+    state = _frame_state(driver)
+    state.base = ()
+    state.current = ()
     driver.switch_to.default_content()
 
 
@@ -87,9 +193,253 @@ def switch_to_default_content(driver):
 def iframe_context(driver, iframe_name):
     """
     Context manager for switching to an iframe by name and automatically returning to default content.
+
+    Returning is deferred until an element is looked up outside the iframe, so consecutive
+    contexts only switch across the iframes that differ, e.g. from info_iframe to
+    posting_iframe through their common parent main_iframe.
     """
+    state = _frame_state(driver)
+    state.contexts.append(_iframe_path(iframe_name))
     try:
-        switch_to_iframe_by_name(driver, iframe_name)
+        _sync_frame(driver, f"enter {iframe_name}")
         yield
     finally:
-        switch_to_default_content(driver)
+        state.contexts.pop()
+
+
+# Finds an element by a Selenium locator strategy in a document.
+_LOCATE_SCRIPT = """
+function locate(doc, by, value) {
+    if (by === "id") return doc.getElementById(value);
+    if (by === "name") return doc.getElementsByName(value)[0] || null;
+    if (by === "css selector") return doc.querySelector(value);
+    if (by === "xpath") {
+        return doc.evaluate(value, doc, null, 9, null).singleNodeValue;
+    }
+    return null;
+}
+"""
+
+_FILL_SCRIPT = _LOCATE_SCRIPT + """
+var fields = arguments[0], click = arguments[1];
+var elements = [], missing = [], mismatched = [];
+function usable(element) {
+    return element && !element.disabled && element.getClientRects().length;
+}
+for (var i = 0; i < fields.length; i++) {
+    elements.push(locate(document, fields[i][0], fields[i][1]));
+    if (!usable(elements[i])) missing.push(i);
+}
+var button = click ? locate(document, click[0], click[1]) : null;
+if (click && !usable(button)) missing.push(-1);
+if (missing.length) return {missing: missing, mismatched: mismatched};
+for (var i = 0; i < fields.length; i++) {
+    var element = elements[i];
+    element.focus();
+    element.value = fields[i][2];
+    element.dispatchEvent(new Event("input", {bubbles: true}));
+    element.dispatchEvent(new Event("change", {bubbles: true}));
+    element.blur();
+    if (String(element.value).indexOf(fields[i][2]) === -1) {
+        mismatched.push([i, String(element.value)]);
+    }
+}
+if (button && !mismatched.length) button.click();
+return {missing: missing, mismatched: mismatched};
+"""
+
+
+def fill_form(
+    driver, fields, step_name="not specified", click=None, timeout=10, poll_interval=0.1
+):
+    """
+    Set the values of many input fields, and optionally click a button, in one JavaScript call.
+
+    The input and change events are dispatched for every field so the page registers the
+    values, which are read back in the same call. The call is repeated every poll_interval
+    seconds until all fields are present, nothing is set before that.
+
+    Parameters:
+    - driver: Selenium WebDriver instance.
+    - fields (dict): field locator -> value, set in the order given.
+    - step_name (str): name of the step for logging.
+    - click (tuple): locator of a button clicked once all values are set and verified.
+    - timeout (float): how long to wait for the fields to be present, in seconds.
+
+    Raises:
+    - TimeoutException: if a field or the button is not found within the timeout.
+    - ValueError: if a field does not hold its value after it was set.
+    """
+    _sync_frame(driver, step_name)
+    with step_timer.timed(step_name, "fill"):
+        _fill_fields(driver, fields, step_name, click, timeout, poll_interval)
+    logging.info(f"{step_name}: {len(fields)} fields filled.")
+
+
+def _fill_fields(driver, fields, step_name, click, timeout, poll_interval):
+    items = [[by, value, str(text)] for (by, value), text in fields.items()]
+    button = list(click) if click is not None else None
+
+    deadline = time.monotonic() + timeout
+    while True:
+        result = driver.execute_script(_FILL_SCRIPT, items, button)
+        if not result["missing"]:
+            break
+        if time.monotonic() >= deadline:
+            locators = [
+                tuple(items[i][:2]) if i >= 0 else click for i in result["missing"]
+            ]
+            logging.warning(
+                f"{step_name}: Elements with locators {locators} not found within {timeout} seconds."
+            )
+            raise TimeoutException(f"{step_name}: Elements {locators} not found.")
+        time.sleep(poll_interval)
+
+    if result["mismatched"]:
+        details = [
+            f"{tuple(items[i][:2])} is '{actual}' instead of '{items[i][2]}'"
+            for i, actual in result["mismatched"]
+        ]
+        logging.error(f"{step_name}: Fields not set: {details}")
+        raise ValueError(f"{step_name}: Fields not set: {details}")
+
+
+# How often each optional dialog was probed and found shown or absent.
+PROBE_STATS = defaultdict(Counter)
+_probe_stats_lock = threading.Lock()
+
+_PROBE_SCRIPT = _LOCATE_SCRIPT + """
+var frameIds = arguments[0], probes = arguments[1];
+var doc = document;
+if (frameIds !== null) {
+    doc = window.top.document;
+    for (var i = 0; i < frameIds.length; i++) {
+        var frame = doc.getElementById(frameIds[i]);
+        if (!frame) return {};
+        try { doc = frame.contentDocument; } catch (e) { doc = null; }
+        if (!doc) return null;
+    }
+}
+var visible = {};
+for (var name in probes) {
+    var element = locate(doc, probes[name][0], probes[name][1]);
+    visible[name] = !!(element && element.getClientRects().length);
+}
+return visible;
+"""
+
+
+def _visible_elements(driver, iframe_name, probes):
+    # One JavaScript call from the top document, or inside the iframe when it is not
+    # reachable from there, returning which of the named locators are visible.
+    frame_ids = []
+    for by, value in IFRAME_PATHS[iframe_name]:
+        if by != "id":
+            frame_ids = None
+            break
+        frame_ids.append(value)
+    visible = driver.execute_script(_PROBE_SCRIPT, frame_ids, probes)
+    if visible is None:
+        with iframe_context(driver, iframe_name):
+            visible = driver.execute_script(_PROBE_SCRIPT, None, probes)
+    return visible
+
+
+def probe_dialogs(driver, dialog_names, timeout=None, poll_interval=0.1):
+    """
+    Non-blocking check of which optional dialogs are currently shown.
+
+    The first step element of every dialog is looked up with one JavaScript call
+    from the top document, repeated every poll_interval seconds until a dialog
+    shows up or the timeout expires. The timeout defaults to the longest "timeout"
+    the dialogs declare, or DIALOG_PROBE_TIMEOUT (default PROBE_TIMEOUT). A dialog
+    declaring a "ready" element is not waited for once that element is shown.
+
+    Parameters:
+    - driver: Selenium WebDriver instance.
+    - dialog_names: names of dialogs in config.dialog_config.OPTIONAL_DIALOGS, which
+      must share the same iframe.
+
+    Returns:
+    - set: names of the dialogs that are shown.
+    """
+    dialogs = [OPTIONAL_DIALOGS[name] for name in dialog_names]
+    if timeout is None:
+        default = float(os.getenv("DIALOG_PROBE_TIMEOUT", PROBE_TIMEOUT))
+        timeout = max(dialog.get("timeout", default) for dialog in dialogs)
+    iframe_name = dialogs[0]["iframe"]
+    probes = {
+        name: list(dialog["steps"][0][0]) for name, dialog in zip(dialog_names, dialogs)
+    }
+    ready = [dialog["ready"] for dialog in dialogs if "ready" in dialog]
+    if len(ready) < len(dialogs):
+        ready = []
+
+    step_name = f"probe {', '.join(dialog_names)}"
+    _sync_frame(driver, step_name)
+    start = time.monotonic()
+    deadline = start + timeout
+    while True:
+        visible = _visible_elements(driver, iframe_name, probes)
+        shown = {name for name in dialog_names if visible.get(name)}
+        if shown or time.monotonic() >= deadline:
+            break
+        if ready and all(
+            _visible_elements(driver, ready_iframe, {"ready": list(locator)}).get(
+                "ready"
+            )
+            for ready_iframe, locator in ready
+        ):
+            break
+        time.sleep(poll_interval)
+
+    step_timer.record(
+        step_name,
+        "probe",
+        time.monotonic() - start,
+        OK if shown else PROBE_MISS,
+    )
+    with _probe_stats_lock:
+        for name in dialog_names:
+            PROBE_STATS[name]["shown" if name in shown else "absent"] += 1
+    return shown
+
+
+def dismiss_optional_dialog(driver, dialog_name):
+    """
+    Probe for an optional dialog and click through its steps if it is shown.
+
+    The dialog is optional, so any WebDriver error while probing or clicking it, e.g. an
+    intercepted click, a stale element or a failed frame switch, is logged and ignored.
+
+    Returns:
+    - bool: True if the dialog was shown.
+    """
+    try:
+        if not probe_dialogs(driver, [dialog_name]):
+            logging.info(f"Optional dialog '{dialog_name}' not shown.")
+            return False
+    except WebDriverException as e:
+        logging.warning(f"Optional dialog '{dialog_name}' could not be probed: {e}")
+        return False
+    dialog = OPTIONAL_DIALOGS[dialog_name]
+    try:
+        with iframe_context(driver, dialog["iframe"]):
+            for locator, step_name in dialog["steps"]:
+                wait_for_element(driver, locator, step_name, silent=True).click()
+    except (TimeoutException, NoSuchElementException):
+        logging.info(f"Optional dialog '{dialog_name}' closed before all steps.")
+    except WebDriverException as e:
+        logging.warning(f"Optional dialog '{dialog_name}' not dismissed: {e}")
+    return True
+
+
+def log_probe_stats():
+    """
+    Log how often each optional dialog was shown.
+    """
+    for name, counts in sorted(PROBE_STATS.items()):
+        logging.info(
+            f"Optional dialog '{name}': shown {counts['shown']} of "
+            f"{counts['shown'] + counts['absent']} probes."
+        )